@@ -6,13 +6,34 @@ from tastypie.resources import NamespacedModelResource, ALL_WITH_RELATIONS, ALL
 from tastypie.authentication import Authentication
 from tastypie.authorization import ReadOnlyAuthorization
 
+from django.views.decorators.http import condition
+
 from haystack.query import SearchQuerySet
 
 from speeches.models import Speech, Speaker, Section
 
-class SectionResource(NamespacedModelResource):
+class ConditionalResourceMixin(object):
+    """Answers a conditional GET of a single object with a 304 if the object
+    hasn't been modified since, going by the latest of the times in
+    last_modified_fields."""
+    last_modified_fields = ( 'modified', )
+
+    def _last_modified(self, request, **kwargs):
+        if 'pk' not in kwargs or 'q' in request.GET:
+            return None
+        rows = self.get_object_list(request).filter(pk=kwargs['pk']).values_list(*self.last_modified_fields)[:1]
+        times = [ t for row in rows for t in row if t ]
+        return max(times) if times else None
+
+    def get_detail(self, request, **kwargs):
+        view = super(ConditionalResourceMixin, self).get_detail
+        return condition(last_modified_func=self._last_modified)(view)(request, **kwargs)
+
+class SectionResource(ConditionalResourceMixin, NamespacedModelResource):
     parent = fields.ForeignKey('self', 'parent', null=True)
     children = fields.ToManyField('self', 'children')
+    # Adding or changing a child touches the rollup
+    last_modified_fields = ( 'modified', 'rollup__subtree_modified' )
 
     def get_object_list(self, request):
         return super(SectionResource, self).get_object_list(request).filter(instance=request.instance)
@@ -20,7 +41,7 @@ class SectionResource(NamespacedModelResource):
     class Meta:
         queryset = Section.objects.all()
         resource_name = 'section'
-        excludes = []
+        excludes = [ 'tree_path', 'depth', 'sort_key' ]
         allowed_methods = [ 'get' ]
         authentication = Authentication()
         authorization = ReadOnlyAuthorization()
@@ -29,7 +50,7 @@ class SectionResource(NamespacedModelResource):
             'parent': ALL,
         }
 
-class SpeakerResource(NamespacedModelResource):
+class SpeakerResource(ConditionalResourceMixin, NamespacedModelResource):
     def get_object_list(self, request):
         return super(SpeakerResource, self).get_object_list(request).filter(instance=request.instance)
 
@@ -44,8 +65,9 @@ class SpeakerResource(NamespacedModelResource):
             'name': ALL,
         }
 
-class SpeechResource(NamespacedModelResource):
+class SpeechResource(ConditionalResourceMixin, NamespacedModelResource):
     speaker = fields.ForeignKey(SpeakerResource, 'speaker', null=True, full=True)
+    last_modified_fields = ( 'modified', 'speaker__modified' )
 
     def apply_filters(self, request, applicable_filters):
         objects = super(SpeechResource, self).apply_filters(request, applicable_filters)
@@ -62,7 +84,7 @@ class SpeechResource(NamespacedModelResource):
     class Meta:
         queryset = Speech.objects.filter(public=True)
         resource_name = 'speech'
-        excludes = [ 'celery_task_id', 'public' ]
+        excludes = [ 'celery_task_id', 'public', 'position', 'text_html' ]
         allowed_methods = ['get', 'post']
         authentication = Authentication()
         authorization = ReadOnlyAuthorization()
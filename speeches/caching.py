@@ -0,0 +1,85 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.core.signals import request_started, request_finished
+
+# Versioned namespaces in the shared cache. Everything cached under a
+# namespace has its version in the key, so bumping the version invalidates
+# it all at once without having to know the keys; old entries just expire.
+
+# Memcached's longest relative timeout
+TIMEOUT = 60 * 60 * 24 * 30
+
+def _version_key(namespace):
+    return 'version:%s' % namespace
+
+def get_version(namespace):
+    """Return the current version of namespace, or None if the cache can't
+    hold one (the dummy cache used in development), in which case nothing
+    should be cached under it."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Start from the time, so a version that has expired or been evicted
+        # doesn't start again at a number that has already been used
+        cache.add(key, int(time.time() * 1000), TIMEOUT)
+        version = cache.get(key)
+    return version
+
+# Versions already looked up during the current request
+_request = threading.local()
+
+def _request_started(**kwargs):
+    _request.versions = {}
+request_started.connect(_request_started)
+
+def _request_finished(**kwargs):
+    _request.versions = None
+request_finished.connect(_request_finished)
+
+def get_request_version(namespace):
+    """As get_version, but looked up only once per request, for things used
+    many times in rendering a page. Outside a request, just get_version."""
+    versions = getattr(_request, 'versions', None)
+    if versions is None:
+        return get_version(namespace)
+    if namespace not in versions:
+        versions[namespace] = get_version(namespace)
+    return versions[namespace]
+
+def bump_version(*namespaces):
+    """Invalidate everything cached under the given namespaces."""
+    versions = getattr(_request, 'versions', None)
+    for namespace in namespaces:
+        if versions:
+            versions.pop(namespace, None)
+        key = _version_key(namespace)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not there, so nothing can be cached under it anyway
+            pass
+
+def versioned_key(namespace, version, key):
+    return '%s:%s:%s' % (namespace, version, key)
+
+def sections_namespace(instance_id):
+    return 'sections:%s' % instance_id
+
+def fragments_namespace(instance_id):
+    """The cached speech fragments of an instance (see fragments), for
+    changes to them that don't change the speeches' modification times."""
+    return 'fragments:%s' % instance_id
+
+def instance_namespace(instance_id):
+    """Everything shown on an instance's pages."""
+    return 'instance:%s' % instance_id
+
+def speaker_slug_key(instance_id, slug):
+    """The key caching the ID of the speaker with slug (now or in the past)
+    in the instance. Kept up to date by Speaker.save, not versioned, as an
+    old slug still leads to the same speaker; a deleted speaker's ID just
+    won't be found. Hashed, as the slug comes from the URL."""
+    return 'speaker-slug:%s:%s' % (instance_id, hashlib.md5(slug.encode('utf-8')).hexdigest())
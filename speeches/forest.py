@@ -0,0 +1,150 @@
+import json
+import zlib
+from array import array
+
+from django.db.models.query_utils import deferred_class_factory
+
+from speeches import caching
+
+# The fields of the sections a forest gives that it holds; the others are
+# deferred, so are fetched from the database if they're asked for
+FIELDS = ( 'id', 'instance_id', 'parent_id', 'title', 'slug', 'tree_path', 'depth' )
+
+_section_class = None
+
+def _forest_section_class():
+    global _section_class
+    if _section_class is None:
+        from speeches.models import Section
+        deferred = [ f.attname for f in Section._meta.fields if f.attname not in FIELDS ]
+        _section_class = deferred_class_factory(Section, deferred)
+    return _section_class
+
+class SectionForest(object):
+    """The hierarchy of an instance's sections, in document order: the ID,
+    title and slug of each, and arrays giving the position of each one's
+    parent, first child and next sibling (-1 if none). It is loaded once per
+    change to the instance's sections and shared through the cache, packed
+    small, so walking the hierarchy needs no database queries."""
+
+    def __init__(self, instance_id, ids, parent, titles, slugs):
+        self.instance_id = instance_id
+        self.ids = ids
+        self.parent = parent
+        self.titles = titles
+        self.slugs = slugs
+        self._link()
+
+    def _link(self):
+        self.index = dict( (id, i) for i, id in enumerate(self.ids) )
+        n = len(self.ids)
+        self.first_child = array('i', [-1] * n)
+        self.next_sibling = array('i', [-1] * n)
+        last_child = array('i', [-1] * n)
+        for i, p in enumerate(self.parent):
+            if p < 0:
+                continue
+            if last_child[p] < 0:
+                self.first_child[p] = i
+            else:
+                self.next_sibling[last_child[p]] = i
+            last_child[p] = i
+
+    @classmethod
+    def load(cls, instance_id):
+        from speeches.models import Section
+        rows = list(Section.objects.filter(instance=instance_id).order_by('sort_key').values_list(
+            'id', 'parent_id', 'title', 'slug'))
+        index = dict( (row[0], i) for i, row in enumerate(rows) )
+        return cls(instance_id,
+            array('i', [ row[0] for row in rows ]),
+            array('i', [ index.get(row[1], -1) for row in rows ]),
+            [ row[2] for row in rows ],
+            [ row[3] for row in rows ])
+
+    # Pickled as the IDs and parents as packed arrays, and the titles and
+    # slugs compressed, to keep well within memcached's limit on a value;
+    # the other arrays are rebuilt from the parents
+    def __getstate__(self):
+        text = zlib.compress(json.dumps([ self.titles, self.slugs ], separators=(',', ':')))
+        return ( self.instance_id, self.ids.tostring(), self.parent.tostring(), text )
+
+    def __setstate__(self, state):
+        self.instance_id, ids, parent, text = state
+        self.ids = array('i')
+        self.ids.fromstring(ids)
+        self.parent = array('i')
+        self.parent.fromstring(parent)
+        self.titles, self.slugs = json.loads(zlib.decompress(text))
+        self._link()
+
+    def __contains__(self, section_id):
+        return section_id in self.index
+
+    def _chain(self, i):
+        """Return the positions of the section at i and its ancestors, root
+        first."""
+        chain = []
+        while i >= 0:
+            chain.append(i)
+            i = self.parent[i]
+        return chain[::-1]
+
+    def _section(self, chain):
+        i = chain[-1]
+        section = _forest_section_class()(
+            id=self.ids[i],
+            instance_id=self.instance_id,
+            parent_id=self.ids[chain[-2]] if len(chain) > 1 else None,
+            title=self.titles[i],
+            slug=self.slugs[i],
+            tree_path=''.join( '%010d/' % self.ids[j] for j in chain ),
+            depth=len(chain) - 1,
+        )
+        # As if fetched from the database
+        section._state.adding = False
+        section._state.db = 'default'
+        return section
+
+    def ancestors(self, section_id):
+        """Return the section's ancestors, root first, including itself."""
+        chain = self._chain(self.index[section_id])
+        return [ self._section(chain[:n]) for n in range(1, len(chain) + 1) ]
+
+    def children(self, section_id):
+        """Return the section's children, in document order."""
+        out = []
+        i = self.index[section_id]
+        chain = self._chain(i)
+        i = self.first_child[i]
+        while i >= 0:
+            out.append(self._section(chain + [ i ]))
+            i = self.next_sibling[i]
+        return out
+
+    def is_leaf(self, section_id):
+        return self.first_child[self.index[section_id]] < 0
+
+
+# The forests this process has already fetched, with their versions
+_loaded = {}
+
+def get_forest(instance_id):
+    """Return the section forest of an instance, or None if there is no
+    shared cache to keep it in, when callers should query as usual."""
+    namespace = caching.sections_namespace(instance_id)
+    version = caching.get_request_version(namespace)
+    if version is None:
+        return None
+    loaded = _loaded.get(instance_id)
+    if loaded and loaded[0] == version:
+        return loaded[1]
+
+    key = caching.versioned_key(namespace, version, 'forest')
+    forest = caching.cache.get(key)
+    if forest is None:
+        forest = SectionForest.load(instance_id)
+        # Too large a forest won't be stored, but this process still keeps it
+        caching.cache.set(key, forest, caching.TIMEOUT)
+    _loaded[instance_id] = (version, forest)
+    return forest
@@ -186,9 +186,8 @@ class SectionForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super(SectionForm, self).__init__(*args, **kwargs)
         if self.instance.id:
-            ids = [ self.instance.id ]
-            ids.extend( [ d.id for d in self.instance.get_descendants ] )
-            self.fields['parent'].queryset = Section.objects.exclude(id__in=ids)
+            # Not itself or anything below it
+            self.fields['parent'].queryset = Section.objects.exclude(tree_path__startswith=self.instance.tree_path)
 
     class Meta:
         model = Section
@@ -199,8 +198,7 @@ class SectionForm(forms.ModelForm):
         if self.instance and parent:
             if parent.id == self.instance.id:
                 raise forms.ValidationError(_('Something cannot be its own parent'))
-            descendant_ids = [ d.id for d in self.instance.get_descendants ]
-            if parent.id in descendant_ids:
+            if self.instance.tree_path and parent.tree_path.startswith(self.instance.tree_path):
                 raise forms.ValidationError(_('Something cannot have a parent that is also a descendant'))
         return parent
 
@@ -261,8 +259,9 @@ class BaseRecordingTimestampFormSet(BaseInlineFormSet):
         # This is slightly complicated because we don't seem to cache this
         # metadata anywhere?  Might make sense to add to Recording?
 
+        # The duration isn't known until the audio has been processed
         delta = (last_timestamp - first_timestamp).seconds
-        if delta >= recording.audio_duration:
+        if recording.audio_duration and delta >= recording.audio_duration:
             raise forms.ValidationError(_('Difference between timestamps is too long for the uploaded audio'))
 
         previous_timestamp = None
@@ -0,0 +1,113 @@
+import hashlib
+
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+from django.utils.translation import get_language
+
+from speeches import caching
+
+# The rendered speech.html of each speech shown in a list is cached, so that
+# a page only renders the speeches that have changed since it was last shown
+# (or that haven't been shown in that variant). A fragment's key includes
+# everything it's made from that can change: the speech and its speaker's
+# modification times, the version of the instance's sections (whose paths
+# are in its links even if it doesn't show the breadcrumbs), and the version
+# of the instance's fragments, for changes that don't touch the speeches,
+# such as re-rendering their HTML.
+
+TEMPLATE = 'speeches/speech.html'
+
+# The flags speech.html is included with that are cached. Any other (the
+# highlight of a search result, say) means the speech is rendered each time.
+VARIANT_FLAGS = ( 'noli', 'nosection', 'nospeaker', 'truncate' )
+
+HITS_KEY = 'stats:speech-fragments:hits'
+MISSES_KEY = 'stats:speech-fragments:misses'
+
+def _date_key(speech):
+    """The parts of the speech's date and time line; consecutive speeches
+    with the same one only show it once."""
+    return ( speech.start_time, speech.start_date != speech.end_date and speech.start_date,
+        speech.end_time, speech.end_date )
+
+def _fragment_key(speech, variant, versions):
+    speaker = speech.speaker_id and speech.speaker
+    parts = [ speech.id, speech.modified.isoformat(),
+        speaker and speaker.modified.isoformat(), versions, get_language() ]
+    parts.extend(variant)
+    return 'speech-fragment:%d:%s' % (speech.id, hashlib.md5(repr(parts)).hexdigest())
+
+def _count(key, n):
+    if not n:
+        return
+    try:
+        caching.cache.incr(key, n)
+    except ValueError:
+        caching.cache.add(key, n, caching.TIMEOUT)
+
+def get_counts():
+    """Return the numbers of fragments found in and missing from the cache
+    since the counts were last reset."""
+    counts = caching.cache.get_many([ HITS_KEY, MISSES_KEY ])
+    return counts.get(HITS_KEY, 0), counts.get(MISSES_KEY, 0)
+
+def reset_counts():
+    caching.cache.delete_many([ HITS_KEY, MISSES_KEY ])
+
+def render_speeches(context, speeches, **flags):
+    """Return speech.html rendered for each speech in the context, included
+    with flags, taking those rendered before from the cache in one go."""
+    variant = [ f for f in sorted(flags) if flags[f] ]
+    cacheable = set(variant) <= set(VARIANT_FLAGS)
+
+    # Which speeches show their date, which speech.html used to do itself
+    # with ifchanged, so it can be cached. In a loop of single speeches, the
+    # last date shown is remembered in the loop, as ifchanged does.
+    forloop = context.get('forloop')
+    last_date = forloop.get('speech_date') if forloop else None
+    samedates = []
+    for speech in speeches:
+        date = _date_key(speech)
+        samedates.append(date == last_date)
+        last_date = date
+    if forloop:
+        forloop['speech_date'] = last_date
+
+    keys = []
+    if cacheable:
+        versions = {}
+        for speech, samedate in zip(speeches, samedates):
+            if speech.instance_id not in versions:
+                versions[speech.instance_id] = (
+                    caching.get_request_version(caching.sections_namespace(speech.instance_id)),
+                    caching.get_request_version(caching.fragments_namespace(speech.instance_id)),
+                )
+            # Only shown with the speaker
+            samedate = samedate and not flags.get('nospeaker')
+            keys.append(_fragment_key(speech, variant + [ 'samedate' ] * samedate, versions[speech.instance_id]))
+        cached = caching.cache.get_many(keys)
+    else:
+        cached = {}
+
+    template = get_template(TEMPLATE)
+    fragments = []
+    missed = {}
+    for i, speech in enumerate(speeches):
+        key = keys[i] if cacheable else None
+        if key in cached:
+            fragments.append(mark_safe(cached[key]))
+            continue
+        context.update(dict(flags, speech=speech, samedate=samedates[i]))
+        try:
+            fragment = template.render(context)
+        finally:
+            context.pop()
+        fragments.append(fragment)
+        if key:
+            missed[key] = fragment
+
+    if cacheable:
+        caching.cache.set_many(missed, caching.TIMEOUT)
+        _count(HITS_KEY, len(cached))
+        _count(MISSES_KEY, len(missed))
+    return fragments
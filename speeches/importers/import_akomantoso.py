@@ -56,6 +56,7 @@ class ImportAkomaNtoso (ImporterBase):
             # pass
 
         self.visit(mainSection, section)
+        self.renumber()
 
         return section
 
@@ -49,6 +49,12 @@ class ImporterBase (object):
 
         self.resolver = None
 
+        # Sections found or created in advance, keyed by tuples of titles
+        self.sections = kwargs.get('sections') or {}
+
+        # Sections with speeches made since they were last renumbered
+        self.unnumbered_sections = set()
+
     def init_popit_data(self):
         SetupEntities(self.popit_url).init_popit_data()
 
@@ -64,12 +70,23 @@ class ImporterBase (object):
                 kwargs['start_date'] = self.start_date
 
         s = cls(instance=self.instance, **kwargs)
+        if cls == Speech:
+            # Put in place by renumber, all at once
+            s.renumber_on_save = False
         if self.commit:
             s.save()
+            if cls == Speech:
+                self.unnumbered_sections.add(s.section_id)
         elif s.title:
             logger.info(s.title)
         return s
 
+    def renumber(self):
+        """Work out the positions of the speeches made since the last time,
+        a section at a time rather than as each was saved."""
+        Speech.objects.renumber(self.unnumbered_sections, instance_id=self.instance and self.instance.id)
+        self.unnumbered_sections = set()
+
     def get_person(self, name):
         cached = self.person_cache.get(name, None)
         if cached:
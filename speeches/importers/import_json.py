@@ -44,6 +44,19 @@ class ImportJson (ImporterBase):
         ImporterBase.__init__(self, **kwargs)
         self.delete_existing = kwargs.get('delete_existing', False)
 
+    @classmethod
+    def section_titles(cls, document_path):
+        """Return the titles of the sections a document's speeches go in, from
+        the top down, so all of them can be found or created in one go."""
+        data = json.load( open(document_path, 'r') )
+        return cls._section_titles(data)
+
+    @staticmethod
+    def _section_titles(data):
+        titles = data.get('parent_section_titles', [])
+        titles.append( data.get( 'title', data.get('organization', '') ) )
+        return titles
+
     def import_document(self, document_path):
 
         data = json.load( open(document_path, 'r') )
@@ -63,10 +76,12 @@ class ImportJson (ImporterBase):
 
         report_url = data.get('report_url', '')
 
-        # Create parents as needed using parent_section_titles
-        parent_section_titles = data.get('parent_section_titles', [])
-        parent_section_titles.append(self.title)
-        section = Section.objects.get_or_create_with_parents(instance=self.instance, titles=parent_section_titles)
+        # Create parents as needed using parent_section_titles, unless they
+        # were all fetched in advance
+        parent_section_titles = self._section_titles(data)
+        section = self.sections.get(tuple(parent_section_titles))
+        if not section:
+            section = Section.objects.get_or_create_with_parents(instance=self.instance, titles=parent_section_titles)
 
         if self.delete_existing:
             section.speech_set.all().delete()
@@ -107,6 +122,7 @@ class ImportJson (ImporterBase):
                 (tag,_) = Tag.objects.get_or_create( name=tagname, instance=self.instance )
                 speech.tags.add(tag)
 
+        self.renumber()
         return section
 
     def get_or_make_section(self, **kwargs):
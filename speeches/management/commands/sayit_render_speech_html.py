@@ -0,0 +1,49 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from speeches import caching
+from speeches.models import Speech
+from speeches.utils.text import text_to_html
+
+class Command(BaseCommand):
+
+    help = "Store the HTML of speeches saved before it was stored on save, or of all speeches with --all (e.g. after changing the BLEACH_* settings)"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--all', action='store_true', default=False, help='Render every speech, not just those without HTML'),
+        make_option('--batch-size', action='store', type='int', default=1000, help='Number of speeches to fetch at once'),
+    )
+
+    def handle(self, *args, **options):
+        verbosity = int(options['verbosity'])
+
+        speeches = Speech.objects.exclude(text='')
+        if not options['all']:
+            speeches = speeches.filter(text_html='')
+
+        rendered = 0
+        instance_ids = set()
+        last_id = 0
+        while True:
+            batch = list(speeches.filter(id__gt=last_id).order_by('id').values_list('id', 'instance_id', 'text')[:options['batch_size']])
+            if not batch:
+                break
+            with transaction.commit_on_success():
+                for id, instance_id, text in batch:
+                    # An update, so as not to count as a change to the speech
+                    Speech.objects.filter(id=id).update(text_html=text_to_html(text))
+                    instance_ids.add(instance_id)
+            rendered += len(batch)
+            last_id = batch[-1][0]
+            if verbosity > 1:
+                self.stdout.write('Rendered %d speeches\n' % rendered)
+
+        # Cached pages and fragments were made from the old HTML. An update
+        # doesn't change the speeches' modification times, so bump both.
+        caching.bump_version(*[ ns(i) for i in instance_ids
+            for ns in (caching.instance_namespace, caching.fragments_namespace) ])
+
+        if verbosity >= 1:
+            self.stdout.write('Rendered the HTML of %d speeches\n' % rendered)
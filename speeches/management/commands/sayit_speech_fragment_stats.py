@@ -0,0 +1,23 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from speeches import fragments
+
+class Command(BaseCommand):
+
+    help = "Show how often speeches shown in lists were found in the fragment cache"
+
+    option_list = BaseCommand.option_list + (
+        make_option('--reset', action='store_true', default=False, help='Start counting again afterwards'),
+    )
+
+    def handle(self, *args, **options):
+        hits, misses = fragments.get_counts()
+        total = hits + misses
+        self.stdout.write('Hits:   %d\n' % hits)
+        self.stdout.write('Misses: %d\n' % misses)
+        if total:
+            self.stdout.write('Hit rate: %.1f%%\n' % (100.0 * hits / total))
+        if options['reset']:
+            fragments.reset_counts()
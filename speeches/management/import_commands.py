@@ -63,6 +63,18 @@ class ImportCommand(BaseCommand):
             if not len(files):
                 raise CommandError("No .%s files found in directory" % self.document_extension)
 
+            # If the importer can say where each document goes, find or
+            # create all the sections at once rather than per document
+            if options['commit'] and hasattr(self.importer_class, 'section_titles'):
+                paths = []
+                for f in files:
+                    try:
+                        paths.append(self.importer_class.section_titles(f))
+                    except Exception:
+                        # It will be reported when imported
+                        pass
+                options['sections'] = Section.objects.get_or_create_many_with_parents(instance, paths)
+
             imports = [self.import_document(f, **options) for f in files]
 
             if options['commit']:
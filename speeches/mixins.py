@@ -1,7 +1,12 @@
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.utils.datastructures import SortedDict
+from django.views.decorators.http import condition
 from django.views.generic.detail import SingleObjectMixin
-from django.http import HttpResponseRedirect
+from django.http import HttpResponseRedirect, Http404
 
 from speeches.utils.base32 import MistypedIDException, base32_to_int
+from speeches.utils.keyset import InvalidCursor, encode_cursor, decode_cursor
 
 class UnmatchingSlugException(Exception):
     pass
@@ -44,3 +49,91 @@ class Base32SingleObjectMixin(SingleObjectMixin):
         if (self.kwargs['slug'] != obj.slug) or mistyped:
             raise UnmatchingSlugException(obj)
         return obj
+
+class KeysetPaginationMixin(object):
+    """Pages through a ListView's objects in their model's keyset_ordering
+    with an 'after' cursor, the sort key of the last object shown, rather
+    than a page number, so that later pages are as quick as the first. The
+    first page has no cursor, so its URL doesn't change.
+
+    keyset_ordering is a list of fields and SQL for each (%s being the
+    column) that is never NULL but sorts as the field does, so that the
+    query is a single row comparison an index on the SQL can start from."""
+
+    def keyset_page(self, queryset, size):
+        """Return the page of queryset after the request's cursor, and the
+        cursor of the page following it, or None if it is the last."""
+        meta = queryset.model._meta
+        ordering = queryset.model.keyset_ordering
+        fields = [ f for f, _ in ordering ]
+        qn = connection.ops.quote_name
+        keys = [ sql % ('%s.%s' % (qn(meta.db_table), qn(meta.get_field(f).column))) for f, sql in ordering ]
+        after = self.request.GET.get('after')
+        if after:
+            try:
+                values = decode_cursor(after)
+                if len(values) != len(fields):
+                    raise InvalidCursor(after)
+                values = [ meta.get_field(f).to_python(v) for f, v in zip(fields, values) ]
+            except (InvalidCursor, ValidationError):
+                raise Http404
+            queryset = queryset.extra(
+                where=[ '(%s) > (%s)' % (', '.join(keys), ', '.join( sql % '%s' for _, sql in ordering )) ],
+                params=values)
+
+        select = SortedDict( ('keyset_%d' % i, key) for i, key in enumerate(keys) )
+        object_list = list(queryset.extra(select=select).order_by(*select.keys())[:size + 1])
+        next_cursor = None
+        if len(object_list) > size:
+            object_list = object_list[:size]
+            last = object_list[-1]
+            next_cursor = encode_cursor(*[ getattr(last, f) for f in fields ])
+        return object_list, next_cursor
+
+    def paginate_queryset(self, queryset, page_size):
+        object_list, self.next_cursor = self.keyset_page(queryset, page_size)
+        # There's no paginator, and the page is just the list of objects
+        return None, object_list, object_list, True
+
+    def get_context_data(self, **kwargs):
+        context = super(KeysetPaginationMixin, self).get_context_data(**kwargs)
+        context['next_cursor'] = getattr(self, 'next_cursor', None)
+        context['is_first_page'] = not self.request.GET.get('after')
+        context['is_paginated'] = bool(context['next_cursor']) or not context['is_first_page']
+        return context
+
+class ConditionalGetMixin(object):
+    """Answers a conditional GET with a 304 if the page hasn't changed since,
+    going by get_last_modified, the latest modification time of what it
+    shows, which should be cheap to find. The ETag also says whether the
+    instance's private speeches are shown, and instance users get no
+    Last-Modified, so they are never told a public page is still fresh.
+
+    Changes to speakers, sections and tags touch the rollups and speaker
+    statistics of the pages that show them. Changes to the instance itself
+    (the title and description in every page's header) are not covered, so
+    a revalidating client may keep the old ones until something on the page
+    changes."""
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return None
+
+    def _last_modified(self, request, *args, **kwargs):
+        if not hasattr(self, '_last_modified_value'):
+            self._last_modified_value = self.get_last_modified(request, *args, **kwargs)
+        return self._last_modified_value
+
+    def _public_last_modified(self, request, *args, **kwargs):
+        if request.is_user_instance:
+            return None
+        return self._last_modified(request, *args, **kwargs)
+
+    def _etag(self, request, *args, **kwargs):
+        last_modified = self._last_modified(request, *args, **kwargs)
+        if not last_modified:
+            return None
+        return '%s-%s' % (last_modified.strftime('%Y%m%d%H%M%S%f'), 'u' if request.is_user_instance else 'p')
+
+    def dispatch(self, request, *args, **kwargs):
+        view = super(ConditionalGetMixin, self).dispatch
+        return condition(etag_func=self._etag, last_modified_func=self._public_last_modified)(view)(request, *args, **kwargs)
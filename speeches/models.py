@@ -5,18 +5,27 @@ import logging
 import os
 
 from django.utils.translation import ugettext_lazy as _
-from django.db import models
-from django.db.models import Q
+from django.db import models, connection, transaction
+from django.db.models import Q, F
+from django.db.models.signals import post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
 from django.utils import timezone
+from django.utils.safestring import mark_safe
 from django.template.defaultfilters import timesince, slugify
 from django.conf import settings
 from django.core.files import File
+from django.core.urlresolvers import reverse
 from django.contrib.contenttypes import generic
+from django.contrib.contenttypes.models import ContentType
 
-from instances.models import InstanceMixin, InstanceManager
+from instances.models import Instance, InstanceMixin, InstanceManager
 import speeches
+from speeches import caching
+from speeches.forest import get_forest
 from speeches.utils import AudioHelper
 from speeches.utils.base32 import int_to_base32
+from speeches.utils.keyset import encode_cursor, decode_cursor
+from speeches.utils.text import text_to_html
 
 from djqmethod import Manager, querymethod
 from popit.models import Person
@@ -55,15 +64,31 @@ class AuditedModel(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     modified = models.DateTimeField(auto_now=True)
 
+    # Fields whose loaded values are remembered, so that save hooks can tell
+    # what has changed (see has_changed).
+    tracked_fields = ()
+
     class Meta:
         abstract = True
 
+    def __init__(self, *args, **kwargs):
+        super(AuditedModel, self).__init__(*args, **kwargs)
+        self._remember_state()
+
+    def _remember_state(self):
+        # Read from __dict__ so deferred fields aren't fetched
+        self._original_state = dict( (f, self.__dict__.get(f)) for f in self.tracked_fields )
+
+    def has_changed(self, *fields):
+        return any( self.__dict__.get(f) != self._original_state.get(f) for f in fields )
+
     def save(self, *args, **kwargs):
         now = timezone.now()
         if not self.id:
             self.created = now
         self.modified = now
         super(AuditedModel, self).save(*args, **kwargs)
+        self._remember_state()
 
 class Slug(SlugModel):
     pass
@@ -75,6 +100,9 @@ class Speaker(InstanceMixin, AuditedModel):
     slug = SluggableField(unique_with='instance', populate_from='name')
     slugs = generic.GenericRelation(Slug)
 
+    # So a new slug can be cached after saving
+    tracked_fields = ('slug',)
+
     class Meta:
         ordering = ('name',)
         unique_together = ('instance', 'slug')
@@ -108,7 +136,10 @@ class Speaker(InstanceMixin, AuditedModel):
                 conflicting_instance = conflicting_instance.exclude(pk=self.id)
             if conflicting_instance.exists():
                 raise Exception('Speaker with this instance and popit person already exists.')
+        old_slug = self._original_state.get('slug')
         super(Speaker, self).save(*args, **kwargs)
+        if self.slug != old_slug:
+            caching.cache.set(caching.speaker_slug_key(self.instance_id, self.slug), self.id, caching.TIMEOUT)
 
 
 class Tag(InstanceMixin, AuditedModel):
@@ -118,6 +149,42 @@ class Tag(InstanceMixin, AuditedModel):
         return self.name
 
 
+# The sort key used to interleave speeches with sections, in SQL (see
+# get_descendants_tree_with_speeches). There is an index on it per section.
+SPEECH_SORT_KEY = "COALESCE(speeches_speech.start_date, date '9999-12-31') + COALESCE(speeches_speech.start_time, time '23:59')"
+
+# The earliest speech time a section is sorted by, relative to the section
+# `top` at depth `depth`: the earliest in its own subtree, or if there are no
+# speeches there that of its nearest ancestor below `top` that has some, or
+# failing that the earliest anywhere below `top`. Expects the section as s
+# and its rollup as r. Rollup times are stored as UTC, see SectionRollup.
+SECTION_SPEECH_MIN_SQL = """COALESCE(
+    r.subtree_speech_min,
+    (SELECT ar.subtree_speech_min FROM speeches_section a
+        JOIN speeches_sectionrollup ar ON ar.section_id = a.id
+        WHERE a.id = ANY(string_to_array(rtrim(s.tree_path, '/'), '/')::integer[])
+        AND a.depth > %(depth)s AND ar.subtree_speech_min IS NOT NULL
+        ORDER BY a.depth DESC LIMIT 1),
+    (SELECT MIN(cr.subtree_speech_min) FROM speeches_section c
+        JOIN speeches_sectionrollup cr ON cr.section_id = c.id
+        WHERE c.parent_id = %(top)s)
+) AT TIME ZONE 'UTC'"""
+
+def unique_slug(slug, taken, max_length):
+    """Return slug, or if it is in taken, it with a number added that isn't."""
+    if slug not in taken:
+        return slug
+    n = 2
+    while '%s-%d' % (slug, n) in taken:
+        n += 1
+    suffix = '-%d' % n
+    return slug[:max_length - len(suffix)] + suffix
+
+def path_ids(tree_path):
+    """Return the section IDs in a tree_path, root first."""
+    return [ int(i) for i in tree_path.split('/') if i ]
+
+
 class SectionManager(InstanceManager, Manager):
 
     def get_or_create_with_parents(self, instance, titles):
@@ -127,14 +194,174 @@ class SectionManager(InstanceManager, Manager):
         if not len(titles):
             return None
 
-        # Get the title to create, the rest and get the parent
-        title = titles[-1]
-        rest = titles[:-1]
-        parent = self.get_or_create_with_parents(instance, rest)
-        
-        section, created = self.get_or_create(instance=instance, title=title, parent=parent)
+        return self.get_or_create_many_with_parents(instance, [ titles ])[tuple(titles)]
+
+    def get_or_create_many_with_parents(self, instance, paths):
+        """Get or create the hierarchies of sections given, each a list of
+        titles from the top down, returning a dict from each path (as a
+        tuple) to its bottom section. The sections that already exist are
+        found with one query, and the rest are bulk inserted a level at a
+        time, in one transaction, with the upkeep save() would do for each
+        (rollups, paths, sort keys, caches) done once for them all."""
+        paths = set( tuple(p) for p in paths if len(p) )
+        titles = set( t for p in paths for t in p )
+        if not titles:
+            return {}
+
+        # Keyed on parent ID and title; the earliest wins if there are several
+        existing = {}
+        for section in self.filter(instance=instance, title__in=titles).order_by('-id'):
+            existing[(section.parent_id, section.title)] = section
+
+        def lookup(path):
+            section = None
+            for title in path:
+                section = existing[(section and section.id, title)]
+            return section
+
+        created = []
+        with transaction.commit_on_success():
+            # Top down, so that each level's parents exist
+            for depth in range(max( len(p) for p in paths )):
+                missing = {}
+                for path in paths:
+                    if len(path) > depth:
+                        parent = lookup(path[:depth])
+                        key = (parent and parent.id, path[depth])
+                        if key not in existing:
+                            missing[key] = parent
+                if missing:
+                    level = self._bulk_create_level(instance, depth, missing)
+                    existing.update(level)
+                    created.extend(level.values())
+
+            if created:
+                ids = [ s.id for s in created ]
+                self.update_sort_keys(ids, inherited=False)
+                SectionPath.objects.add(ids)
+                SectionRollup.objects.touch(ids, neighbours=True)
+                InstanceStatistics.objects.add(instance.id, section_count=len(created))
+                caching.bump_version(caching.sections_namespace(instance.id), caching.instance_namespace(instance.id))
+
+        return dict( (path, lookup(path)) for path in paths )
+
+    def _bulk_create_level(self, instance, depth, missing):
+        """Insert sections at depth, given as a dict from (parent ID, title)
+        to parent, with slugs unique among their siblings, tree paths and
+        rollups. Returns them, keyed as given."""
+        parent_ids = set( parent_id for parent_id, _ in missing )
+        siblings = Q(parent__in=[ i for i in parent_ids if i ])
+        if None in parent_ids:
+            siblings |= Q(parent__isnull=True)
+        taken = {}
+        for parent_id, slug in self.filter(siblings, instance=instance).values_list('parent_id', 'slug'):
+            taken.setdefault(parent_id, set()).add(slug)
+
+        max_length = self.model._meta.get_field('slug').max_length
+        keys = {}
+        sections = []
+        for (parent_id, title), parent in sorted(missing.items()):
+            slug = unique_slug(slugify(title)[:max_length], taken.setdefault(parent_id, set()), max_length)
+            taken[parent_id].add(slug)
+            keys[(parent_id, slug)] = (parent_id, title)
+            sections.append(self.model(instance=instance, parent=parent, title=title, slug=slug, depth=depth))
+        self.bulk_create(sections)
+
+        # Bulk inserts don't give back IDs, so fetch them again
+        out = {}
+        for section in self.filter(siblings, instance=instance, slug__in=[ slug for _, slug in keys ]):
+            key = keys.get((section.parent_id, section.slug))
+            if key:
+                parent = missing[key]
+                section.tree_path = '%s%010d/' % (parent.tree_path if parent else '', section.id)
+                out[key] = section
+        created = out.values()
+        cursor = connection.cursor()
+        cursor.execute(
+            """UPDATE speeches_section s SET tree_path = v.tree_path
+            FROM (SELECT unnest(%s) AS id, unnest(%s) AS tree_path) v
+            WHERE s.id = v.id""",
+            [ [ s.id for s in created ], [ s.tree_path for s in created ] ]
+        )
+        SectionRollup.objects.bulk_create([ SectionRollup(section_id=s.id) for s in created ])
+        # The slug history that SluggableField records on save, which old
+        # URLs are looked up in
+        content_type = ContentType.objects.get_for_model(self.model)
+        Slug.objects.bulk_create([ Slug(content_type=content_type, object_id=s.id, slug=s.slug, redirect=False) for s in created ])
+        return out
+
+    def update_sort_keys(self, section_ids, subtree=None, inherited=True):
+        """Recompute the stored sort_key of the given sections, and of every
+        section under the tree_path subtree if given. If inherited is set,
+        also do the sections with no speeches in the same trees, as their
+        keys come from their ancestors."""
+        where, params = [], []
+        section_ids = tuple(set( i for i in section_ids if i ))
+        if section_ids:
+            where.append('s.id IN %s')
+            params.append(section_ids)
+            if inherited:
+                where.append("""(r.subtree_speech_min IS NULL AND substr(s.tree_path, 1, 11) IN
+                    (SELECT substr(tree_path, 1, 11) FROM speeches_section WHERE id IN %s))""")
+                params.append(section_ids)
+        if subtree:
+            where.append('s.tree_path LIKE %s')
+            params.append(subtree + '%')
+        if not where:
+            return
+
+        cursor = connection.cursor()
+        cursor.execute(
+            """UPDATE speeches_section s SET sort_key = substr(s.tree_path, 1, 11)
+                || COALESCE(to_char(""" + SECTION_SPEECH_MIN_SQL % { 'depth': '0', 'top': 'substr(s.tree_path, 1, 10)::integer' } + """,
+                    'YYYYMMDDHH24MISSUS'), '00000000000000000000')
+                || '/' || s.tree_path
+            FROM speeches_sectionrollup r
+            WHERE r.section_id = s.id AND (""" + ' OR '.join(where) + ')',
+            params
+        )
+        transaction.commit_unless_managed()
+
+    def resolve_paths(self, objects):
+        """Given sections and/or speeches, fill in get_ancestors and get_path
+        of all their sections (and the sections of the speeches) with one
+        query, so a list of them can be shown with breadcrumbs and links.
+        Returns the objects, which may be a QuerySet (that is evaluated)."""
+        sections = []
+        speeches = []
+        for o in objects:
+            if isinstance(o, Section):
+                sections.append(o)
+            elif o.section_id:
+                speeches.append(o)
+        for o in speeches:
+            # Use the section if it has been fetched already
+            if hasattr(o, '_section_cache'):
+                sections.append(o.section)
+
+        ids = set(s.id for s in sections) | set(o.section_id for o in speeches)
+        if not ids:
+            return objects
+        lookup = self.get_query_set().extra(
+            where=[ """speeches_section.id IN (
+                SELECT unnest(string_to_array(rtrim(s.tree_path, '/'), '/')::integer[])
+                FROM speeches_section s WHERE s.id IN %s)""" ],
+            params=[ tuple(ids) ]
+        )
+        lookup = dict( (s.id, s) for s in lookup )
+        for o in speeches:
+            if not hasattr(o, '_section_cache'):
+                o.section = lookup[o.section_id]
 
-        return section
+        # Setting these replaces the cached properties
+        for s in lookup.values() + sections:
+            s.get_ancestors = [ lookup[i] for i in s.tree_path_ids[:-1] ] + [ s ]
+            s.get_path = '/'.join([ a.slug for a in s.get_ancestors ])
+        return objects
+
+
+class SectionMoveException(Exception):
+    pass
 
 
 class Section(AuditedModel, InstanceMixin):
@@ -146,6 +373,20 @@ class Section(AuditedModel, InstanceMixin):
     slug = SluggableField(unique_with='parent', populate_from='title')
     slugs = generic.GenericRelation(Slug)
 
+    # Materialised path of this section, e.g. "0000000003/0000000012/" -
+    # zero-padded IDs from the root down, so that a subtree is a prefix match.
+    tree_path = models.TextField(db_index=True, blank=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+
+    # Document order within the root section, for finding the next/previous
+    # section at the same depth: the root's path, the time of the earliest
+    # speech (see SECTION_SPEECH_MIN_SQL; zeros if none), then tree_path.
+    # Kept up to date with the rollups.
+    sort_key = models.TextField(blank=True, editable=False)
+
+    # So a move can be spotted before saving, and a rename after
+    tracked_fields = ('parent_id', 'slug', 'title')
+
     class Meta:
         ordering = ('id',)
         unique_together = ('parent', 'slug')
@@ -153,15 +394,111 @@ class Section(AuditedModel, InstanceMixin):
     def __unicode__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        created = not self.id
+        if not created and self.has_changed('parent_id'):
+            self._make_slug_unique()
+        old_slug = self._original_state.get('slug')
+        # The section forests hold titles and slugs as well as the hierarchy
+        reshaped = created or self.has_changed('parent_id', 'slug', 'title')
+        super(Section, self).save(*args, **kwargs)
+        old_path = self._update_tree_path()
+        if created:
+            SectionRollup.objects.create(section=self)
+        elif old_path:
+            # Moved, so both the old and new ancestors' totals change
+            SectionRollup.objects.refresh([ self.id ] + path_ids(old_path)[-2:-1])
+        Section.objects.update_sort_keys([ self.id ], subtree=old_path and self.tree_path, inherited=False)
+        if created or old_path or self.slug != old_slug:
+            SectionPath.objects.refresh(self)
+        if old_path or (not created and self.slug != old_slug):
+            # The paths of every section below us have changed, and are
+            # linked to from anywhere in our tree (and the one we left) by
+            # the sections next to them
+            SectionRollup.objects.touch(path_ids(self.tree_path)[:1] + path_ids(old_path or '')[:1], descendants=True)
+        else:
+            # Our pages, those of the sections below us, and those of the
+            # sections next to us show our title
+            SectionRollup.objects.touch([ self.id ], descendants=not created, neighbours=True)
+        if not created:
+            # As do the pages of the speakers of the speeches below us
+            SpeakerStatistics.objects.filter(
+                speaker__in=Speech.objects.filter(section__tree_path__startswith=self.tree_path).values('speaker_id')
+            ).update(speech_modified=timezone.now())
+        if reshaped:
+            caching.bump_version(caching.sections_namespace(self.instance_id))
+
+    def move_to(self, parent):
+        """Move this section, and everything below it, to be under parent, or
+        to the top level if parent is None. The subtree's paths and both the
+        old and new ancestors' rollups are updated by set-based queries (see
+        save), and the slug changed if it clashes with one already there."""
+        # Get our current path, which save moves the subtree from, and check
+        # for a cycle while we're at it
+        ids = [ self.id ] + ([ parent.id ] if parent else [])
+        paths = dict( (id, (tree_path, depth)) for id, tree_path, depth in
+            Section.objects.filter(id__in=ids).values_list('id', 'tree_path', 'depth') )
+        self.tree_path, self.depth = paths[self.id]
+        if parent and paths[parent.id][0].startswith(self.tree_path):
+            raise SectionMoveException('A section cannot be moved to within itself')
+        with transaction.commit_on_success():
+            self.parent = parent
+            self.save()
+
+    def _make_slug_unique(self):
+        """If our slug is taken under our (new) parent, add a number to it."""
+        taken = set(Section.objects.filter(instance=self.instance_id, parent=self.parent_id, slug__startswith=self.slug).exclude(id=self.id).values_list('slug', flat=True))
+        self.slug = unique_slug(self.slug, taken, self._meta.get_field('slug').max_length)
+
+    def _update_tree_path(self):
+        """Make sure tree_path and depth match our parent. If we have been
+        moved, the paths of the whole subtree are rewritten in one UPDATE.
+        Returns the previous path if it changed."""
+        if self.parent_id:
+            parent_path, parent_depth = Section.objects.values_list('tree_path', 'depth').get(id=self.parent_id)
+            depth = parent_depth + 1
+        else:
+            parent_path, depth = '', 0
+        tree_path = '%s%010d/' % (parent_path, self.id)
+        if tree_path == self.tree_path and depth == self.depth:
+            return
+
+        old_path, old_depth = self.tree_path, self.depth
+        Section.objects.filter(id=self.id).update(tree_path=tree_path, depth=depth)
+        if old_path:
+            cursor = connection.cursor()
+            cursor.execute(
+                """UPDATE speeches_section
+                SET tree_path = %s || substr(tree_path, %s), depth = depth + %s
+                WHERE tree_path LIKE %s AND id != %s""",
+                [ tree_path, len(old_path) + 1, depth - old_depth, old_path + '%', self.id ]
+            )
+            transaction.commit_unless_managed()
+        self.tree_path, self.depth = tree_path, depth
+        return old_path
+
+    @property
+    def tree_path_ids(self):
+        return path_ids(self.tree_path)
+
     def speech_datetimes(self):
         return (datetime.datetime.combine(s.start_date, s.start_time or datetime.time(0,0) )
                 for s in self.speech_set.all())
 
     def is_leaf_node(self):
+        # Set when fetched as part of a full descendants list
+        if hasattr(self, '_is_leaf'):
+            return self._is_leaf
+        forest = get_forest(self.instance_id)
+        if forest and self.id in forest:
+            return forest.is_leaf(self.id)
         return not self.children.exists()
 
     @cache
     def get_children(self):
+        forest = get_forest(self.instance_id)
+        if forest and self.id in forest:
+            return forest.children(self.id)
         tree = self.get_descendants
         try:
             lvl = tree[0].level
@@ -171,48 +508,44 @@ class Section(AuditedModel, InstanceMixin):
 
     @cache
     def get_ancestors(self):
-        # Cached for now, so these aren't supplied as arguments
-        ascending = False
-        include_self = True
-        """Return the ancestors of the current Section, in either direction,
-        optionally including itself."""
-        dir = ascending and 'ASC' or 'DESC'
-        s = Section.objects.raw(
-            """WITH RECURSIVE cte AS (
-                SELECT speeches_section.*, 1 AS l FROM speeches_section WHERE id=%s
-                UNION ALL
-                SELECT s.*, l+1 FROM cte JOIN speeches_section s ON cte.parent_id = s.id
-            )
-            SELECT * FROM cte ORDER BY l """ + dir,
-            [ self.id ]
-        )
-        if not include_self:
-            s = ascending and s[1:] or s[:-1]
-        return list(s) # So it's evaluated and will be cached
+        """Return the ancestors of the current Section, root first,
+        including itself."""
+        ids = self.tree_path_ids
+        if len(ids) < 2:
+            return [ self ]
+        forest = get_forest(self.instance_id)
+        if forest and self.id in forest:
+            return forest.ancestors(self.id)[:-1] + [ self ]
+        lookup = Section.objects.in_bulk(ids[:-1])
+        lookup[self.id] = self
+        return [ lookup[i] for i in ids ] # A list, so it's evaluated and will be cached
 
     def _get_descendants(self, include_self=False, include_count='', include_min='', max_depth=''):
         """Return the descendants of the current Section, in depth-first order.
-        Optionally, include speech counts, minimum speech times, and only
-        descend a certain depth."""
-        select = [ '*' ]
-        if include_count:
-            select.append("(SELECT COUNT(*) FROM speeches_speech WHERE section_id = cte.id) AS speech_count")
-        if include_min:
-            select.append("(SELECT MIN( start_date + COALESCE(start_time, time '00:00') ) FROM speeches_speech WHERE section_id = cte.id) AS speech_min")
-        if max_depth:
-            max_depth = "WHERE array_upper(path, 1) < %d" % (max_depth+1)
-        s = Section.objects.raw(
-            """WITH RECURSIVE cte AS (
-                SELECT speeches_section.*, 0 AS level, ARRAY[id] AS path FROM speeches_section WHERE id=%s
-                UNION ALL
-                SELECT s.*, level+1, cte.path||s.id FROM cte JOIN speeches_section s ON cte.id = s.parent_id
-            """ + max_depth + """
-            )
-            SELECT """ + ','.join(select) + """ FROM cte ORDER BY path""",
-            [ self.id ]
-        )
+        Optionally, include speech counts, minimum speech times (both from
+        the rollups; the time is the earliest in each section's subtree), and
+        only descend a certain depth."""
+        s = Section.objects.filter(tree_path__startswith=self.tree_path)
         if not include_self:
-            s = s[1:]
+            s = s.filter(depth__gt=self.depth)
+        if max_depth:
+            s = s.filter(depth__lte=self.depth + max_depth)
+        s = list(s.order_by('tree_path'))
+
+        if include_count or include_min:
+            rollups = SectionRollup.objects.in_bulk([ d.id for d in s ])
+        parent_ids = set(d.parent_id for d in s)
+        for d in s:
+            # Relative to ourselves, as the templates and tree code expect
+            d.level = d.depth - self.depth
+            d.path = d.tree_path_ids[self.depth:]
+            if not max_depth:
+                d._is_leaf = d.id not in parent_ids
+            rollup = rollups.get(d.id) if (include_count or include_min) else None
+            if include_count:
+                d.speech_count = rollup.speech_count if rollup else 0
+            if include_min:
+                d.speech_min = rollup.subtree_earliest() if rollup else None
         return s
 
     @cache
@@ -308,24 +641,103 @@ class Section(AuditedModel, InstanceMixin):
                 return iter(tree_final)
         return _iterable()
 
+    def get_descendants_tree_with_speeches_page(self, request, after=None, size=100):
+        """As get_descendants_tree_with_speeches, but only return a window of
+        up to size sections and speeches, starting after the cursor given.
+        Returns the tree and the cursor for the next window, if any. Both
+        sections and speeches are fetched with keyset queries, so a window
+        late in a huge section costs the same as the first one.
+
+        Sections the first item is within are repeated at the start of the
+        window, as they are if a speech interrupts a subtree, so that the
+        levels always nest properly."""
+        speeches = self.speech_set.all().visible(request)
+        section_where, section_params = 'TRUE', []
+        if after:
+            # Raises InvalidCursor if it's not one of ours
+            after_dt, after_kind, after_key = decode_cursor(after)
+            if after_kind == 0:
+                speeches = speeches.extra(where=[ '(%s, speeches_speech.id) > (%%s, %%s)' % SPEECH_SORT_KEY ], params=[ after_dt, after_key ])
+                section_where, section_params = 'sort_dt >= %s', [ after_dt ]
+            else:
+                speeches = speeches.extra(where=[ '%s > %%s' % SPEECH_SORT_KEY ], params=[ after_dt ])
+                section_where, section_params = '(sort_dt, tree_path) > (%s, %s)', [ after_dt, after_key ]
+        speeches = speeches.extra(select={ 'sort_dt': SPEECH_SORT_KEY }).order_by('sort_dt', 'id')
+        speeches = speeches.select_related('speaker').prefetch_related('tags')[:size+1]
+
+        # Sections sort by the earliest speech in their subtree, or, if they
+        # have none, that of their nearest ancestor that does (falling back
+        # to the earliest below us); then in tree order.
+        sections = Section.objects.raw(
+            """SELECT * FROM (
+                SELECT s.*, r.speech_count,
+                    NOT EXISTS (SELECT 1 FROM speeches_section c WHERE c.parent_id = s.id) AS _is_leaf,
+                    COALESCE(""" + SECTION_SPEECH_MIN_SQL % { 'depth': '%s', 'top': '%s' } + """,
+                        timestamp '9999-12-31 23:59') AS sort_dt
+                FROM speeches_section s JOIN speeches_sectionrollup r ON r.section_id = s.id
+                WHERE s.tree_path LIKE %s AND s.depth > %s
+            ) x WHERE """ + section_where + """
+            ORDER BY sort_dt, tree_path LIMIT %s""",
+            [ self.depth, self.id, self.tree_path + '%', self.depth ] + section_params + [ size+1 ]
+        )
+
+        # Speeches sort before sections with the same time, as they do above
+        items = sorted(
+            [ ((s.sort_dt, 0, s.id), s) for s in speeches ] +
+            [ ((s.sort_dt, 1, s.tree_path), s) for s in sections ]
+        )
+        next_cursor = None
+        if len(items) > size:
+            items = items[:size]
+            next_cursor = encode_cursor(*items[-1][0])
+
+        # Work out the level of everything, adding in any sections we are
+        # within that aren't open at that point
+        rows = []
+        open_path = []
+        for key, node in items:
+            if key[1] == 0:
+                rows.append( [ node, { 'speech': True }, 1 ] )
+                open_path = []
+                continue
+            node.level = node.depth - self.depth
+            node.path = node.tree_path_ids[self.depth:]
+            ancestors = node.path[1:-1]
+            common = 0
+            while common < min(len(open_path), len(ancestors)) and open_path[common] == ancestors[common]:
+                common += 1
+            for i in range(common, len(ancestors)):
+                rows.append( [ ancestors[i], {}, i + 1 ] )
+            rows.append( [ node, {}, node.level ] )
+            open_path = node.path[1:]
+        context = Section.objects.in_bulk([ r[0] for r in rows if not isinstance(r[0], models.Model) ])
+        for r in rows:
+            if not isinstance(r[0], models.Model):
+                r[0] = context[r[0]]
+
+        out = []
+        for i, (node, s, level) in enumerate(rows):
+            prev_level = rows[i-1][2] if i else 0
+            next_level = rows[i+1][2] if i < len(rows) - 1 else 0
+            if level > prev_level:
+                s['new_level'] = True
+            if next_level < level:
+                s['closed_levels'] = range(level, next_level, -1)
+            out.append( (node, s) )
+        return out, next_cursor
+
     @cache
     def get_descendants(self):
         return self._get_descendants_by_speech()
 
     def _get_descendants_by_speech(self, **kwargs):
+        # Each speech_min is already the earliest in that section's subtree
         dqs = self._get_descendants(include_min=True, **kwargs)
 
         lookup = dict((x.id, x) for x in dqs)
         lookup[self.id] = self
-        self.speech_min = None
-
-        for d in dqs:
-            if not d.speech_min:
-                continue
-            for parent_id in reversed(d.path):
-                parent = lookup[parent_id]
-                if not parent.speech_min or d.speech_min < parent.speech_min:
-                    parent.speech_min = d.speech_min
+        mins = [ d.speech_min for d in dqs if d.speech_min ]
+        self.speech_min = min(mins) if mins else None
 
         # Set the speech_min to all the earliests
         for d in dqs:
@@ -355,19 +767,20 @@ class Section(AuditedModel, InstanceMixin):
         return '/'.join([ s.slug for s in self.get_ancestors ])
 
     def _get_next_previous_node(self, direction):
-        if not self.parent:
-            return None
-        root = self.get_ancestors[0]
-        tree = root.get_descendants
-        idx = tree.index(self)
-        lvl = tree[idx].level
-        same_level = [ s for s in tree if s.level == lvl ]
-        idx = same_level.index(self)
-        if direction == -1 and idx == 0: return None
-        try:
-            return same_level[idx+direction]
-        except:
+        if not self.parent_id:
             return None
+        neighbours = self.__dict__.setdefault('_neighbours', {})
+        if direction not in neighbours:
+            # Bound the range by the root's part of the key, so the index
+            # scan stops at the edge of this tree
+            root = self.sort_key[:11]
+            same_level = Section.objects.filter(depth=self.depth)
+            if direction == 1:
+                same_level = same_level.filter(sort_key__gt=self.sort_key, sort_key__lt=root + '9' * 21).order_by('sort_key')
+            else:
+                same_level = same_level.filter(sort_key__lt=self.sort_key, sort_key__gt=root).order_by('-sort_key')
+            neighbours[direction] = (list(same_level[:1]) or [ None ])[0]
+        return neighbours[direction]
 
     def get_next_node(self):
         """Fetch the next node in the tree, at the same level as this one."""
@@ -379,41 +792,312 @@ class Section(AuditedModel, InstanceMixin):
 
     def descendant_speeches(self):
         """Return a queryset of all speeches that belong to this section, or any of its descendants."""
-        section_descendants = self._get_descendants(include_self=True)
-        section_descendants_ids = [x.id for x in section_descendants]
-        return Speech.objects.filter(section__in=section_descendants_ids)
+        return Speech.objects.filter(section__tree_path__startswith=self.tree_path)
+
+
+class SectionRollupManager(models.Manager):
+
+    def refresh(self, section_ids):
+        """Recompute the rollups of the given sections from their speeches,
+        then the subtree totals of those sections and all their ancestors,
+        deepest first so each level can be built from the one below."""
+        section_ids = set( i for i in section_ids if i )
+        if not section_ids:
+            return
+
+        levels = {}
+        instance_ids = set()
+        for tree_path, instance_id in Section.objects.filter(id__in=section_ids).values_list('tree_path', 'instance_id'):
+            instance_ids.add(instance_id)
+            for depth, id in enumerate(path_ids(tree_path)):
+                levels.setdefault(depth, set()).add(id)
+        if not levels:
+            return
+        levels_ids = set().union(*levels.values())
+
+        cursor = connection.cursor()
+        cursor.execute(
+            """UPDATE speeches_sectionrollup r SET
+                speech_count = (SELECT COUNT(*) FROM speeches_speech WHERE section_id = r.section_id),
+                speech_min = (SELECT MIN( start_date + COALESCE(start_time, time '00:00') ) FROM speeches_speech WHERE section_id = r.section_id),
+                speech_max = (SELECT MAX( start_date + COALESCE(start_time, time '00:00') ) FROM speeches_speech WHERE section_id = r.section_id)
+            WHERE r.section_id IN %s""",
+            [ tuple(section_ids) ]
+        )
+        before = dict(self.filter(section__in=levels_ids).values_list('section_id', 'subtree_speech_min'))
+
+        # LEAST and GREATEST ignore NULLs, so empty sections don't count
+        for depth in sorted(levels, reverse=True):
+            cursor.execute(
+                """UPDATE speeches_sectionrollup r SET
+                    subtree_speech_count = r.speech_count + COALESCE(c.speech_count, 0),
+                    subtree_speech_min = LEAST(r.speech_min, c.speech_min),
+                    subtree_speech_max = GREATEST(r.speech_max, c.speech_max)
+                FROM (
+                    SELECT parent.id AS section_id, SUM(cr.subtree_speech_count) AS speech_count,
+                        MIN(cr.subtree_speech_min) AS speech_min, MAX(cr.subtree_speech_max) AS speech_max
+                    FROM speeches_section parent
+                    LEFT JOIN speeches_section child ON child.parent_id = parent.id
+                    LEFT JOIN speeches_sectionrollup cr ON cr.section_id = child.id
+                    WHERE parent.id IN %s
+                    GROUP BY parent.id
+                ) c
+                WHERE r.section_id = c.section_id""",
+                [ tuple(levels[depth]) ]
+            )
+        transaction.commit_unless_managed()
+
+        # Sort keys only change if an earliest time has
+        after = self.filter(section__in=levels_ids).values_list('section_id', 'subtree_speech_min')
+        changed = [ id for id, speech_min in after if before.get(id) != speech_min ]
+        if changed:
+            # The forests only need reloading if the order of sections has
+            # changed, not just their times
+            trees = Section.objects.filter(instance__in=instance_ids, tree_path__regex=r'^(%s)/' % '|'.join(
+                '%010d' % id for id in levels[0])).order_by('sort_key').values_list('id', flat=True)
+            order = list(trees)
+            Section.objects.update_sort_keys(changed)
+            if list(trees.all()) != order:
+                caching.bump_version(*[ caching.sections_namespace(i) for i in instance_ids ])
+                # Which sections are next to which has changed
+                self.touch(levels[0], descendants=True)
+
+    def touch(self, section_ids, descendants=False, neighbours=False):
+        """Record that something in the given sections has changed now, so
+        that they and their ancestors (and descendants, and the previous and
+        next sections at the same level, which link to them, if asked) have
+        new validators for conditional GETs."""
+        section_ids = tuple(set( i for i in section_ids if i ))
+        if not section_ids:
+            return
+        where = """section_id IN (
+            SELECT unnest(string_to_array(rtrim(tree_path, '/'), '/')::integer[])
+            FROM speeches_section WHERE id IN %s
+        )"""
+        params = [ timezone.now(), section_ids ]
+        if descendants:
+            where += """ OR section_id IN (
+                SELECT d.id FROM speeches_section s
+                JOIN speeches_section d ON d.tree_path LIKE s.tree_path || '%%'
+                WHERE s.id IN %s
+            )"""
+            params.append(section_ids)
+        if neighbours:
+            # As found by Section._get_next_previous_node
+            where += """ OR section_id IN (
+                SELECT (SELECT n.id FROM speeches_section n WHERE n.depth = s.depth
+                    AND n.sort_key > s.sort_key AND n.sort_key < substr(s.sort_key, 1, 11) || %s
+                    ORDER BY n.sort_key LIMIT 1)
+                FROM speeches_section s WHERE s.id IN %s AND s.parent_id IS NOT NULL
+                UNION
+                SELECT (SELECT n.id FROM speeches_section n WHERE n.depth = s.depth
+                    AND n.sort_key < s.sort_key AND n.sort_key > substr(s.sort_key, 1, 11)
+                    ORDER BY n.sort_key DESC LIMIT 1)
+                FROM speeches_section s WHERE s.id IN %s AND s.parent_id IS NOT NULL
+            )"""
+            params.extend([ '9' * 21, section_ids, section_ids ])
+        cursor = connection.cursor()
+        cursor.execute("UPDATE speeches_sectionrollup SET subtree_modified = %s WHERE " + where, params)
+        transaction.commit_unless_managed()
+
+
+class SectionRollup(models.Model):
+    """Speech counts and earliest/latest speech times of a section, for its
+    own speeches and for its whole subtree. Kept up to date by the save and
+    delete hooks at the bottom of this file.
+
+    The times are speech dates and times as entered, with no time zone, so
+    are stored as if UTC; use the methods to get them back as entered."""
+    section = models.OneToOneField(Section, primary_key=True, related_name='rollup')
+
+    speech_count = models.PositiveIntegerField(default=0)
+    speech_min = models.DateTimeField(null=True, blank=True)
+    speech_max = models.DateTimeField(null=True, blank=True)
+
+    subtree_speech_count = models.PositiveIntegerField(default=0)
+    subtree_speech_min = models.DateTimeField(null=True, blank=True)
+    subtree_speech_max = models.DateTimeField(null=True, blank=True)
+
+    # When anything shown on the section's page last changed, as far as
+    # its own modified time doesn't say (see touch)
+    subtree_modified = models.DateTimeField(null=True, blank=True)
+
+    objects = SectionRollupManager()
+
+    def __unicode__(self):
+        return u'Rollup of %s' % self.section_id
+
+    def subtree_earliest(self):
+        return _naive(self.subtree_speech_min)
+
+    def subtree_latest(self):
+        return _naive(self.subtree_speech_max)
+
+
+# The slug path of each section, from its ancestors' slugs in depth order,
+# for the sections matched by %(where)s
+SECTION_SLUG_PATHS_SQL = """
+    SELECT s.id AS section_id, s.instance_id, string_agg(a.slug, '/' ORDER BY a.depth) AS path
+    FROM speeches_section s
+    JOIN speeches_section a ON a.id = ANY(string_to_array(rtrim(s.tree_path, '/'), '/')::integer[])
+    WHERE %(where)s
+    GROUP BY s.id, s.instance_id
+"""
+
+class SectionPathManager(models.Manager):
+
+    def resolve(self, instance, full_slug):
+        """Return the section whose URL path in instance is full_slug, now or
+        before a rename or move, and whether it is the current one; or None
+        and False if there is no such path."""
+        paths = self.filter(instance=instance, path=full_slug).select_related('section')
+        # A current path wins over another section's old one
+        paths = list(paths.order_by('-canonical', '-id')[:1])
+        if not paths:
+            return None, False
+        return paths[0].section, paths[0].canonical
+
+    def add(self, section_ids):
+        """Record the paths of new sections, which have none yet."""
+        cursor = connection.cursor()
+        cursor.execute(
+            """INSERT INTO speeches_sectionpath (instance_id, path, section_id, canonical)
+            SELECT instance_id, path, section_id, true FROM (""" +
+                SECTION_SLUG_PATHS_SQL % { 'where': 's.id IN %s' } + """) n""",
+            [ tuple(section_ids) ]
+        )
+        transaction.commit_unless_managed()
+
+    def refresh(self, section):
+        """Record the current paths of section and its descendants, keeping
+        their previous ones so that old URLs can be redirected."""
+        paths = SECTION_SLUG_PATHS_SQL % { 'where': 's.instance_id = %s AND s.tree_path LIKE %s' }
+        params = [ section.instance_id, section.tree_path + '%' ]
+        cursor = connection.cursor()
+        cursor.execute(
+            """UPDATE speeches_sectionpath SET canonical = false
+            WHERE canonical AND section_id IN (
+                SELECT id FROM speeches_section WHERE instance_id = %s AND tree_path LIKE %s
+            )""",
+            params
+        )
+        cursor.execute(
+            """DELETE FROM speeches_sectionpath p USING (""" + paths + """) n
+            WHERE p.section_id = n.section_id AND p.path = n.path""",
+            params
+        )
+        cursor.execute(
+            """INSERT INTO speeches_sectionpath (instance_id, path, section_id, canonical)
+            SELECT instance_id, path, section_id, true FROM (""" + paths + """) n""",
+            params
+        )
+        transaction.commit_unless_managed()
+
+
+class SectionPath(models.Model):
+    """A section's URL path of slugs, as it is now or was before it or an
+    ancestor was renamed or moved, so that SectionView can find a section
+    from its URL, or spot an old URL to redirect, with one query."""
+    instance = models.ForeignKey(Instance, related_name='+')
+    path = models.TextField()
+    section = models.ForeignKey(Section, related_name='paths')
+    canonical = models.BooleanField(default=True)
+
+    objects = SectionPathManager()
+
+    def __unicode__(self):
+        return self.path
 
 
+def _naive(dt):
+    return dt.replace(tzinfo=None) if dt else None
+
+
+AUDIO_PENDING = 'pending'
+AUDIO_CONVERTING = 'converting'
+AUDIO_READY = 'ready'
+AUDIO_FAILED = 'failed'
+AUDIO_STATUS_CHOICES = (
+    ( AUDIO_PENDING, _('Waiting to be converted') ),
+    ( AUDIO_CONVERTING, _('Being converted') ),
+    ( AUDIO_READY, _('Ready') ),
+    ( AUDIO_FAILED, _('Could not be converted') ),
+)
+
 class AudioMP3Mixin(object):
-    def save(self, *args, **kwargs):
-        """Overriden save method to automatically convert the audio to an mp3"""
-        duration = kwargs.pop('duration', None)
-        needs_conversion = self.audio and not self.audio.name.lower().endswith('.mp3')
-
-        # If we have an audio file and it's not an mp3, make it one
-        if duration or needs_conversion:
-            if not os.path.exists(self.audio.path):
-                # If it doesn't already exist, save the old audio first so that we can re-encode it
-                # This is needed if it's newly uploaded
-                self.audio.save(self.audio.name, File(self.audio), save=False)
-
-            audio_helper = speeches.utils.AudioHelper()
-
-            if needs_conversion:
-                mp3_filename = audio_helper.make_mp3(self.audio.path)
-                mp3_file = open(mp3_filename, 'rb')
-                self.audio.save(mp3_file.name, File(mp3_file), save=False)
+    """For models with uploaded audio, which is converted to an mp3 (and
+    measured) by a celery task rather than on save, so that web requests
+    never wait for ffmpeg. audio_status says how far that has got. Models
+    define queue_audio_processing to start the task; it's called when new
+    audio is saved, unless queue_on_save is False."""
+
+    queue_on_save = True
 
-            if duration:
-                self.audio_duration = audio_helper.get_audio_duration(self.audio.path)
+    def audio_needs_processing(self):
+        return not self.audio.name.lower().endswith('.mp3')
 
-        # Call the original model save to do everything
+    def save(self, *args, **kwargs):
+        # A new upload, which is stored as it is until the task gets to it
+        process = False
+        if self.audio and not self.audio._committed:
+            process = self.audio_needs_processing()
+            self.audio_status = AUDIO_PENDING if process else AUDIO_READY
         super(AudioMP3Mixin, self).save(*args, **kwargs)
+        if process and self.queue_on_save:
+            self.queue_audio_processing()
+
+    @property
+    def has_audio(self):
+        return bool(self.audio)
+
+    @property
+    def audio_url(self):
+        return self.audio.url
+
+    @property
+    def audio_ready(self):
+        return self.has_audio and self.audio_status == AUDIO_READY
+
+    @property
+    def audio_processing(self):
+        return self.has_audio and self.audio_status in ( AUDIO_PENDING, AUDIO_CONVERTING )
+
+    def convert_audio(self):
+        """Make the audio an mp3, if it isn't one already. Only to be run in
+        a celery task; raises AudioException if ffmpeg fails."""
+        if self.audio.name.lower().endswith('.mp3'):
+            return
+        mp3_filename = AudioHelper().make_mp3(self.audio.path)
+        try:
+            with open(mp3_filename, 'rb') as mp3_file:
+                self.audio.save(mp3_file.name, File(mp3_file), save=False)
+        finally:
+            os.remove(mp3_filename)
 
 
 # Speech manager
 class SpeechManager(InstanceManager, Manager):
-    pass
+
+    def renumber(self, section_ids, instance_id=None):
+        """Recompute the position of every speech in the given sections, with
+        one UPDATE each. A section ID of None means the speeches of instance
+        instance_id that are not in a section."""
+        cursor = connection.cursor()
+        for section_id in set(section_ids):
+            if section_id:
+                where, params = 'section_id = %s', [ section_id ]
+            else:
+                where, params = 'section_id IS NULL AND instance_id = %s', [ instance_id ]
+            cursor.execute(
+                """UPDATE speeches_speech s SET position = n.position
+                FROM (
+                    SELECT id, row_number() OVER (ORDER BY start_date, start_time, id) AS position
+                    FROM speeches_speech WHERE """ + where + """
+                ) n
+                WHERE s.id = n.id AND s.position IS DISTINCT FROM n.position""",
+                params
+            )
+        transaction.commit_unless_managed()
 
 
 # Speech that a speaker gave
@@ -456,17 +1140,55 @@ class Speech(InstanceMixin, AudioMP3Mixin, AuditedModel):
     # Task id for celery transcription tasks
     celery_task_id = models.CharField(max_length=256, null=True, blank=True)
 
+    audio_status = models.CharField(max_length=16, choices=AUDIO_STATUS_CHOICES, default=AUDIO_READY, editable=False)
+
+    # Or audio that is a piece of a recording's, served from it by the
+    # SpeechAudio view rather than copied: where it starts, in seconds from
+    # the start of the recording, and how long it lasts (None to the end)
+    recording = models.ForeignKey('Recording', null=True, blank=True, on_delete=models.SET_NULL, related_name='+', editable=False)
+    recording_start = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    recording_duration = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    # Place in the section (or in the instance, for speeches not in one), in
+    # start date/time/ID order, counting from 1. Kept up to date on save.
+    position = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    # Whether a save works out our new position. Bulk changes turn it off,
+    # then renumber the sections they changed once at the end.
+    renumber_on_save = True
+
+    # Length of the text in characters and words, so that longest speeches
+    # and averages don't need the text. Set on save.
+    text_length = models.PositiveIntegerField(default=0, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+
+    # The text as sanitised HTML paragraphs, for the templates to show
+    # as is. Set on save; sayit_render_speech_html fills in older speeches.
+    text_html = models.TextField(blank=True, editable=False)
+
+    # Changes to the first three mean the section rollups need refreshing,
+    # to the others (and section_id and start_date) the statistics
+    tracked_fields = ('section_id', 'start_date', 'start_time', 'public', 'text_length', 'speaker_id')
+
     class Meta:
         verbose_name_plural = 'speeches'
         ordering = ( 'start_date', 'start_time', 'id' )
 
+    # The same, with NULLs replaced by values that sort as they do, for
+    # KeysetPaginationMixin; the ordering indexes are on these
+    keyset_ordering = (
+        ( 'start_date', "COALESCE(%s, 'infinity'::date)" ),
+        ( 'start_time', "COALESCE(%s, '24:00'::time)" ),
+        ( 'id', '%s' ),
+    )
+
     def __unicode__(self):
         out = 'Speech'
         if self.title: out += ', %s,' % self.title
         if self.speaker: out += ' by %s' % self.speaker
         if self.start_date: out += ' at %s' % self.start_date
         if self.text: out += ' (with text)'
-        if self.audio: out += ' (with audio)'
+        if self.has_audio: out += ' (with audio)'
         return out
 
     @querymethod
@@ -479,14 +1201,21 @@ class Speech(InstanceMixin, AudioMP3Mixin, AuditedModel):
     def is_public(self):
         return self.public
 
+    @property
+    def html(self):
+        """The text as sanitised HTML, made now if not yet stored."""
+        if self.text and not self.text_html:
+            return text_to_html(self.text)
+        return mark_safe(self.text_html)
+
     @property
     def summary(self):
         summary_length = settings.SPEECH_SUMMARY_LENGTH
         default_transcription = settings.DEFAULT_TRANSCRIPTION
-        if self.audio and (not self.text or self.text == default_transcription):
+        if self.has_audio and (not self.text or self.text == default_transcription):
             return "[ recorded audio ]"
         else:
-            return self.text[:summary_length] + '...' if len(self.text) > summary_length else self.text
+            return self.text[:summary_length] + '...' if self.text_length > summary_length else self.text
 
     @models.permalink
     def get_absolute_url(self):
@@ -496,45 +1225,44 @@ class Speech(InstanceMixin, AudioMP3Mixin, AuditedModel):
     def get_edit_url(self):
         return ( 'speeches:speech-edit', (), { 'pk': self.id } )
 
+    @property
+    def has_audio(self):
+        return bool(self.audio) or self.recording_id is not None
+
+    @property
+    def audio_url(self):
+        if self.audio:
+            return self.audio.url
+        return reverse('speeches:speech-audio', kwargs={ 'pk': self.id })
+
     @models.permalink
     def get_delete_url(self):
         return ( 'speeches:speech-delete', (), { 'pk': self.id } )
 
-    def get_next_speech(self):
-        """Return the next speech to this one in the same section, in a start
-        date/time/ID ordering."""
-        if self.start_date:
-            # A later date, or no date present
-            q1 = Q(start_date__gt=self.start_date) | Q(start_date__isnull=True)
-            # Or, if on the same date...
-            q2 = Q(start_date=self.start_date)
-        else:
-            # No dates later than our unknown
-            q1 = Q()
-            # But in that case...
-            q2 = Q(start_date__isnull=True)
-        if self.start_time:
-            # If the time is later, or not present, or the same with a greater ID
-            q3 = Q(start_time__gt=self.start_time) | Q(start_time__isnull=True) | Q(start_time=self.start_time, id__gt=self.id)
-        else:
-            # If the time is not present and the ID is greater
-            q3 = Q(start_time__isnull=True, id__gt=self.id)
-        q = q1 | ( q2 & q3 )
-
-        if self.section:
-            s = list(Speech.objects.filter(q, section=self.section)[:1])
-        else:
-            s = list(Speech.objects.filter(q, instance=self.instance, section__isnull=True)[:1])
-        if s: return s[0]
-        if self.section:
-            next_section = self.section.get_next_node()
-            if next_section:
-                s = next_section.speech_set.all()[:1]
-        return s and s[0] or None
-
-    def get_previous_speech(self):
-        """Return the previous speech to this one in the same section,
-        in a start date/time/ID ordering."""
+    def save(self, *args, **kwargs):
+        self.text_length = len(self.text or '')
+        self.word_count = len((self.text or '').split())
+        self.text_html = text_to_html(self.text)
+        position = self.position
+        if self.id:
+            # Leave the stored position as it is, as others' saves may have
+            # moved us along since we were loaded; _update_position moves us
+            # if our place has changed
+            self.position = F('position')
+        try:
+            super(Speech, self).save(*args, **kwargs)
+        finally:
+            if isinstance(self.position, F):
+                self.position = position
+
+    def _in_same_place(self, section_id):
+        """The speeches sharing positions with us, if in section_id."""
+        if section_id:
+            return Speech.objects.filter(section=section_id)
+        return Speech.objects.filter(instance=self.instance_id, section__isnull=True)
+
+    def _earlier_q(self):
+        """A Q matching speeches before this one in start date/time/ID order."""
         if self.start_date:
             # A date less than ours
             q1 = Q(start_date__lt=self.start_date)
@@ -551,23 +1279,53 @@ class Speech(InstanceMixin, AudioMP3Mixin, AuditedModel):
         else:
             # If there is a time, or there isn't but the ID is smaller
             q3 = Q(start_time__isnull=False) | Q(start_time__isnull=True, id__lt=self.id)
-        q = q1 | ( q2 & q3 )
+        return q1 | ( q2 & q3 )
+
+    def _update_position(self, old_section_id):
+        """Move this speech to its place in its section, closing the gap it
+        leaves and shifting along those after it."""
+        if isinstance(self.position, F):
+            # Where we were, as saved
+            self.position = Speech.objects.filter(id=self.id).values_list('position', flat=True)[0]
+        if self.position:
+            self._in_same_place(old_section_id).filter(position__gt=self.position).exclude(id=self.id).update(position=F('position') - 1)
+        position = self._in_same_place(self.section_id).filter(self._earlier_q()).exclude(id=self.id).count() + 1
+        self._in_same_place(self.section_id).filter(position__gte=position).exclude(id=self.id).update(position=F('position') + 1)
+        Speech.objects.filter(id=self.id).update(position=position)
+        self.position = position
 
-        if self.section:
-            s = list(Speech.objects.filter(q, section=self.section).reverse()[:1])
-        else:
-            s = list(Speech.objects.filter(q, instance=self.instance, section__isnull=True).reverse()[:1])
+    def get_next_speech(self):
+        """Return the next speech to this one in the same section, in a start
+        date/time/ID ordering."""
+        s = list(self._in_same_place(self.section_id).filter(position__gt=self.position).order_by('position')[:1])
+        if s: return s[0]
+        if self.section_id:
+            next_section = self.section.get_next_node()
+            if next_section:
+                s = next_section.speech_set.order_by('position')[:1]
+        return s and s[0] or None
+
+    def get_previous_speech(self):
+        """Return the previous speech to this one in the same section,
+        in a start date/time/ID ordering."""
+        s = list(self._in_same_place(self.section_id).filter(position__lt=self.position).order_by('-position')[:1])
         if s: return s[0]
-        if self.section:
+        if self.section_id:
             prev_section = self.section.get_previous_node()
             if prev_section:
-                s = prev_section.speech_set.all().reverse()[:1]
+                s = prev_section.speech_set.order_by('-position')[:1]
         return s and s[0] or None
 
+    def queue_audio_processing(self):
+        speeches.tasks.convert_speech_audio.delay(self.id)
+
     def start_transcribing(self):
         """Kick off a celery task to transcribe this speech"""
         # We only do anything if there's no text already
         if not self.text:
+            # If the audio is still being converted, that will do it after
+            if self.audio_processing:
+                return
             # If someone is adding a new audio file and there's already a task
             # We need to clear it
             if self.celery_task_id:
@@ -601,10 +1359,19 @@ class Recording(InstanceMixin, AudioMP3Mixin, AuditedModel):
     audio = models.FileField(upload_to='recordings/%Y-%m-%d/', max_length=255, blank=False)
     start_datetime = models.DateTimeField(blank=True, null=True, help_text='Datetime of first timestamp associated with recording')
     audio_duration = models.IntegerField(blank=True, null=False, default=0, help_text='Duration of recording, in seconds')
+    audio_status = models.CharField(max_length=16, choices=AUDIO_STATUS_CHOICES, default=AUDIO_READY, editable=False)
 
-    def save(self, *args, **kwargs):
-        kwargs['duration'] = True
-        super(Recording, self).save(*args, **kwargs)
+    # Queued by the views instead, once the recording's timestamps are saved
+    queue_on_save = False
+
+    def audio_needs_processing(self):
+        # Even an mp3 needs measuring and splitting into speeches
+        return True
+
+    def queue_audio_processing(self):
+        """Convert and measure the audio if it's new, then (re)make the
+        speeches from the timestamps, in a celery task"""
+        speeches.tasks.process_recording.delay(self.id)
 
     def __unicode__(self):
         return u'Recording made %s ago' % timesince(self.created)
@@ -614,14 +1381,44 @@ class Recording(InstanceMixin, AudioMP3Mixin, AuditedModel):
         return ( 'speeches:recording-view', (), { 'pk': self.id } )
 
     def add_speeches_to_section(self, section):
-        return Speech.objects.filter(recordingtimestamp__recording=self).update(section=section)
-
-    def create_or_update_speeches(self, instance):
+        speeches = Speech.objects.filter(recordingtimestamp__recording=self)
+        old_sections = list(speeches.values_list('section_id', flat=True).distinct())
+        updated = speeches.update(section=section)
+        SectionRollup.objects.refresh(old_sections + [ section.id ])
+        SectionRollup.objects.touch(old_sections + [ section.id ])
+        SpeakerStatistics.objects.refresh(speeches.values_list('speaker_id', flat=True).distinct())
+        caching.bump_version(caching.instance_namespace(self.instance_id))
+        Speech.objects.renumber(old_sections + [ section.id ], instance_id=self.instance_id)
+        return updated
+
+    def audio_pieces(self):
+        """Return the start (in seconds from the start of the recording) and
+        duration (None for until the end) of the piece of the audio for each
+        timestamp, in order, or for the whole recording if there are none."""
+        timestamps = list(self.timestamps.order_by('timestamp'))
+        if not timestamps:
+            return [ (0, None) ]
+        start_timestamp = calendar.timegm(self.start_datetime.timetuple())
+        starts = [ max(timestamp.utc - start_timestamp, 0) for timestamp in timestamps ]
+        return [ (start, end - start) for start, end in zip(starts, starts[1:]) ] + [ (starts[-1], None) ]
+
+    def create_or_update_speeches(self, instance, virtual=None):
+        """Make a speech for each timestamp (or one for the whole recording),
+        or update the ones already made. If virtual (by default
+        settings.SPEECH_AUDIO_FROM_RECORDINGS), each speech's audio is its
+        piece of the recording's, rather than a copy cut from it."""
         created_speeches = []
+        # The speeches are put in place all at once at the end
+        section_ids = set()
 
-        # Split the recording's audio files
-        audio_helper = AudioHelper()
-        audio_files = audio_helper.split_recording(self)
+        if virtual is None:
+            virtual = settings.SPEECH_AUDIO_FROM_RECORDINGS
+        if virtual:
+            audio_files = self.audio_pieces()
+        else:
+            # Split the recording's audio files
+            audio_helper = AudioHelper()
+            audio_files = audio_helper.split_recording(self)
         sorted_timestamps = self.timestamps.order_by("timestamp")
 
         for index, audio_file in enumerate(audio_files):
@@ -653,9 +1450,17 @@ class Recording(InstanceMixin, AudioMP3Mixin, AuditedModel):
                     speech.end_date = next_timestamp.timestamp.date()
                     speech.end_time = next_timestamp.timestamp.time()
 
-            audio_file = open(audio_file, 'rb')
-            speech.audio = File(audio_file)
+            if virtual:
+                speech.audio = ''
+                speech.recording = self
+                speech.recording_start, speech.recording_duration = audio_file
+            else:
+                speech.recording = speech.recording_start = speech.recording_duration = None
+                audio_file = open(audio_file, 'rb')
+                speech.audio = File(audio_file)
+            speech.renumber_on_save = False
             speech.save()
+            section_ids.add(speech.section_id)
 
             if new:
                 created_speeches.append( speech )
@@ -663,4 +1468,410 @@ class Recording(InstanceMixin, AudioMP3Mixin, AuditedModel):
                     timestamp.speech = speech
                     timestamp.save()
 
+        Speech.objects.renumber(section_ids, instance_id=instance.id)
         return created_speeches
+
+
+class InstanceStatisticsManager(models.Manager):
+
+    def for_instance(self, instance):
+        """Return the statistics of instance, working them out if they
+        haven't been yet."""
+        try:
+            return self.get(instance=instance)
+        except InstanceStatistics.DoesNotExist:
+            self.refresh([ instance.id ])
+            return self.get(instance=instance)
+
+    def add(self, instance_id, **deltas):
+        """Add the given amounts to an instance's statistics, e.g.
+        add(1, speech_count=1), with one UPDATE."""
+        deltas = dict( (k, F(k) + v) for k, v in deltas.items() if v )
+        if not deltas:
+            return
+        if not self.filter(instance=instance_id).update(**deltas):
+            # Not worked out yet, so do so now, which includes this change
+            self.refresh([ instance_id ])
+
+    def refresh(self, instance_ids=None):
+        """Work out the statistics of the given instances (or all of them)
+        from scratch, correcting any drift from changes that didn't go
+        through save and delete, such as queryset updates."""
+        if instance_ids is None:
+            instance_ids = list(Instance.objects.values_list('id', flat=True))
+        instance_ids = tuple(set(instance_ids))
+        if not instance_ids:
+            return
+
+        cursor = connection.cursor()
+        cursor.execute(
+            """INSERT INTO speeches_instancestatistics
+                (instance_id, speech_count, public_speech_count, section_count, speaker_count, text_length)
+            SELECT id, 0, 0, 0, 0, 0 FROM instances_instance i
+            WHERE id IN %s AND NOT EXISTS (
+                SELECT 1 FROM speeches_instancestatistics WHERE instance_id = i.id
+            )""",
+            [ instance_ids ]
+        )
+        cursor.execute(
+            """UPDATE speeches_instancestatistics st SET
+                speech_count = (SELECT COUNT(*) FROM speeches_speech WHERE instance_id = st.instance_id),
+                public_speech_count = (SELECT COUNT(*) FROM speeches_speech WHERE instance_id = st.instance_id AND public),
+                text_length = (SELECT COALESCE(SUM(text_length), 0) FROM speeches_speech WHERE instance_id = st.instance_id),
+                section_count = (SELECT COUNT(*) FROM speeches_section WHERE instance_id = st.instance_id),
+                speaker_count = (SELECT COUNT(*) FROM speeches_speaker WHERE instance_id = st.instance_id)
+            WHERE st.instance_id IN %s""",
+            [ instance_ids ]
+        )
+        transaction.commit_unless_managed()
+
+
+class InstanceStatistics(models.Model):
+    """Counts of an instance's speeches, sections and speakers, and the total
+    length of its speeches' text, for its home page. Kept up to date by the
+    save and delete hooks below, and refreshed from scratch nightly by
+    speeches.tasks.refresh_instance_statistics."""
+    instance = models.OneToOneField(Instance, primary_key=True, related_name='statistics')
+
+    speech_count = models.PositiveIntegerField(default=0)
+    public_speech_count = models.PositiveIntegerField(default=0)
+    section_count = models.PositiveIntegerField(default=0)
+    speaker_count = models.PositiveIntegerField(default=0)
+    text_length = models.BigIntegerField(default=0)
+
+    objects = InstanceStatisticsManager()
+
+    class Meta:
+        verbose_name_plural = 'instance statistics'
+
+    def __unicode__(self):
+        return u'Statistics of %s' % self.instance_id
+
+    def visible_speech_count(self, request):
+        """The number of speeches Speech.visible(request) would show."""
+        if request.is_user_instance:
+            return self.speech_count
+        return self.public_speech_count
+
+    @property
+    def average_length(self):
+        if not self.speech_count:
+            return None
+        return float(self.text_length) / self.speech_count
+
+
+class SpeakerStatisticsManager(models.Manager):
+
+    def for_speaker(self, speaker):
+        """Return the statistics of speaker, with its longest speech."""
+        statistics = self.select_related('longest_speech')
+        try:
+            return statistics.get(speaker=speaker)
+        except SpeakerStatistics.DoesNotExist:
+            self.refresh([ speaker.id ])
+            return statistics.get(speaker=speaker)
+
+    def _section_deltas(self, speech_id, state, sign):
+        """The changes to the section counts from adding or taking away a
+        speech in state, going by whether the speaker has others there."""
+        deltas = {}
+        if state.get('section_id'):
+            others = Speech.objects.filter(speaker=state['speaker_id'], section=state['section_id']).exclude(id=speech_id)
+            if not others.exists():
+                deltas['section_count'] = sign
+            if state.get('public') and not others.filter(public=True).exists():
+                deltas['public_section_count'] = sign
+        return deltas
+
+    def add(self, speech_id, state):
+        """Add a speech, given as a dict of its tracked fields, to its
+        speaker's statistics, with one UPDATE after a check or two of the
+        speaker's other speeches in its section."""
+        speaker_id = state.get('speaker_id')
+        if not speaker_id:
+            return
+        deltas = self._section_deltas(speech_id, state, 1)
+        cursor = connection.cursor()
+        cursor.execute(
+            """UPDATE speeches_speakerstatistics SET
+                speech_count = speech_count + 1,
+                public_speech_count = public_speech_count + %s,
+                section_count = section_count + %s,
+                public_section_count = public_section_count + %s,
+                first_speech_date = LEAST(first_speech_date, %s),
+                last_speech_date = GREATEST(last_speech_date, %s),
+                longest_speech_id = CASE
+                    WHEN longest_speech_id IS NULL
+                        OR %s > (SELECT text_length FROM speeches_speech WHERE id = longest_speech_id)
+                    THEN %s ELSE longest_speech_id END
+            WHERE speaker_id = %s""",
+            [ int(bool(state.get('public'))), deltas.get('section_count', 0), deltas.get('public_section_count', 0),
+              state.get('start_date'), state.get('start_date'), state.get('text_length') or 0, speech_id, speaker_id ]
+        )
+        updated = cursor.rowcount
+        transaction.commit_unless_managed()
+        if not updated:
+            # Not worked out yet, so do so now, which includes this speech
+            self.refresh([ speaker_id ])
+
+    def remove(self, speech_id, state):
+        """Take a speech, given as a dict of its tracked fields as they were,
+        away from its speaker's statistics. If it was their longest, or on
+        their first or last date, those have to be worked out again, so
+        their statistics are refreshed instead. Returns whether they were."""
+        speaker_id = state.get('speaker_id')
+        if not speaker_id:
+            return False
+        current = list(self.filter(speaker=speaker_id).values_list('longest_speech_id', 'first_speech_date', 'last_speech_date'))
+        # A deleted longest speech has been set to NULL already
+        if not current or current[0][0] in (None, speech_id) or state.get('start_date') in current[0][1:]:
+            self.refresh([ speaker_id ])
+            return True
+        deltas = dict(self._section_deltas(speech_id, state, -1),
+            speech_count=-1, public_speech_count=-1 if state.get('public') else 0)
+        self.filter(speaker=speaker_id).update(**dict( (k, F(k) + v) for k, v in deltas.items() if v ))
+        return False
+
+    def change(self, speech_id, old, new):
+        """Move a speech from its old tracked fields to its new ones."""
+        refreshed = self.remove(speech_id, old)
+        if not (refreshed and old.get('speaker_id') == new.get('speaker_id')):
+            self.add(speech_id, new)
+
+    def refresh(self, speaker_ids=None):
+        """Work out the statistics of the given speakers (or all of them)
+        from their speeches, with one query for each step. For bulk changes
+        and the nightly check; single speeches use add and remove."""
+        if speaker_ids is None:
+            speaker_ids = Speaker.objects.values_list('id', flat=True)
+        speaker_ids = tuple(set( i for i in speaker_ids if i ))
+        if not speaker_ids:
+            return
+
+        cursor = connection.cursor()
+        cursor.execute(
+            """INSERT INTO speeches_speakerstatistics
+                (speaker_id, speech_count, public_speech_count, section_count, public_section_count)
+            SELECT id, 0, 0, 0, 0 FROM speeches_speaker sp
+            WHERE id IN %s AND NOT EXISTS (
+                SELECT 1 FROM speeches_speakerstatistics WHERE speaker_id = sp.id
+            )""",
+            [ speaker_ids ]
+        )
+        cursor.execute(
+            """UPDATE speeches_speakerstatistics st SET
+                speech_count = c.speech_count,
+                public_speech_count = c.public_speech_count,
+                section_count = c.section_count,
+                public_section_count = c.public_section_count,
+                first_speech_date = c.first_speech_date,
+                last_speech_date = c.last_speech_date,
+                longest_speech_id = (
+                    SELECT id FROM speeches_speech WHERE speaker_id = st.speaker_id
+                    ORDER BY text_length DESC, id LIMIT 1
+                )
+            FROM (
+                SELECT sp.id AS speaker_id, COUNT(s.id) AS speech_count,
+                    SUM(CASE WHEN s.public THEN 1 ELSE 0 END) AS public_speech_count,
+                    COUNT(DISTINCT s.section_id) AS section_count,
+                    COUNT(DISTINCT CASE WHEN s.public THEN s.section_id END) AS public_section_count,
+                    MIN(s.start_date) AS first_speech_date, MAX(s.start_date) AS last_speech_date
+                FROM speeches_speaker sp
+                LEFT JOIN speeches_speech s ON s.speaker_id = sp.id
+                WHERE sp.id IN %s
+                GROUP BY sp.id
+            ) c
+            WHERE st.speaker_id = c.speaker_id""",
+            [ speaker_ids ]
+        )
+        transaction.commit_unless_managed()
+
+
+class SpeakerStatistics(models.Model):
+    """Counts of a speaker's speeches and the sections they are in, the span
+    of their dates and the longest speech, for the speaker pages. Updated
+    by the save and delete hooks below whenever a speech changes speaker,
+    section, date, visibility or text."""
+    speaker = models.OneToOneField(Speaker, primary_key=True, related_name='statistics')
+
+    speech_count = models.PositiveIntegerField(default=0)
+    public_speech_count = models.PositiveIntegerField(default=0)
+    section_count = models.PositiveIntegerField(default=0)
+    public_section_count = models.PositiveIntegerField(default=0)
+    first_speech_date = models.DateField(null=True, blank=True)
+    last_speech_date = models.DateField(null=True, blank=True)
+    longest_speech = models.ForeignKey(Speech, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    # When one of the speaker's speeches last changed
+    speech_modified = models.DateTimeField(null=True, blank=True)
+
+    objects = SpeakerStatisticsManager()
+
+    class Meta:
+        verbose_name_plural = 'speaker statistics'
+
+    def __unicode__(self):
+        return u'Statistics of %s' % self.speaker_id
+
+    def visible_speech_count(self, request):
+        """The number of speeches Speech.visible(request) would show."""
+        if request.is_user_instance:
+            return self.speech_count
+        return self.public_speech_count
+
+    def visible_section_count(self, request):
+        if request.is_user_instance:
+            return self.section_count
+        return self.public_section_count
+
+
+def _speech_state(speech):
+    """The speech's tracked fields as they are now, as in _original_state."""
+    return dict( (f, speech.__dict__.get(f)) for f in speech.tracked_fields )
+
+def _speech_statistics(speech, sign=1):
+    """The amounts speech adds to its instance's statistics."""
+    return {
+        'speech_count': sign,
+        'public_speech_count': sign if speech.public else 0,
+        'text_length': sign * speech.text_length,
+    }
+
+
+@receiver(post_save, sender=Speech)
+def speech_saved(sender, instance, created, **kwargs):
+    if created:
+        InstanceStatistics.objects.add(instance.instance_id, **_speech_statistics(instance))
+    elif instance.has_changed('public', 'text_length'):
+        old = instance._original_state
+        InstanceStatistics.objects.add(instance.instance_id,
+            public_speech_count=int(bool(instance.public)) - int(bool(old.get('public'))),
+            text_length=instance.text_length - (old.get('text_length') or 0),
+        )
+    if created or instance.has_changed('section_id', 'start_date', 'start_time'):
+        old_section_id = instance._original_state.get('section_id')
+        if instance.renumber_on_save:
+            instance._update_position(old_section_id)
+        SectionRollup.objects.refresh([ instance.section_id, old_section_id ])
+    if created or instance.has_changed('speaker_id', 'section_id', 'start_date', 'public', 'text_length'):
+        if created:
+            SpeakerStatistics.objects.add(instance.id, _speech_state(instance))
+        else:
+            SpeakerStatistics.objects.change(instance.id, instance._original_state, _speech_state(instance))
+    _touch_speech(instance)
+
+def _touch_speech(speech):
+    """Mark the pages showing speech, before and after any change to its
+    section or speaker, as changed."""
+    old = speech._original_state
+    # The sections next to theirs link to their first and last speeches
+    SectionRollup.objects.touch([ speech.section_id, old.get('section_id') ], neighbours=True)
+    speaker_ids = set( i for i in [ speech.speaker_id, old.get('speaker_id') ] if i )
+    if speaker_ids:
+        SpeakerStatistics.objects.filter(speaker__in=speaker_ids).update(speech_modified=timezone.now())
+
+@receiver(post_delete, sender=Speech)
+def speech_deleted(sender, instance, **kwargs):
+    if instance.position:
+        instance._in_same_place(instance.section_id).filter(position__gt=instance.position).update(position=F('position') - 1)
+    SectionRollup.objects.refresh([ instance.section_id ])
+    InstanceStatistics.objects.add(instance.instance_id, **_speech_statistics(instance, sign=-1))
+    SpeakerStatistics.objects.remove(instance.id, _speech_state(instance))
+    _touch_speech(instance)
+
+@receiver(post_save, sender=Section)
+def section_saved(sender, instance, created, **kwargs):
+    if created:
+        InstanceStatistics.objects.add(instance.instance_id, section_count=1)
+
+@receiver(pre_delete, sender=Section)
+def section_deleting(sender, instance, **kwargs):
+    # The sections next to it link to it
+    SectionRollup.objects.touch([ instance.id ], neighbours=True)
+    # The speakers whose speeches are about to be left in no section
+    instance._speaker_ids = list(Speech.objects.filter(section=instance).values_list('speaker_id', flat=True).distinct())
+
+@receiver(post_delete, sender=Section)
+def section_deleted(sender, instance, **kwargs):
+    # Any deleted ancestors are skipped by refresh
+    SectionRollup.objects.refresh([ instance.parent_id ])
+    SectionRollup.objects.touch([ instance.parent_id ])
+    caching.bump_version(caching.sections_namespace(instance.instance_id))
+    # Its speeches are now not in a section
+    Speech.objects.renumber([ None ], instance_id=instance.instance_id)
+    InstanceStatistics.objects.add(instance.instance_id, section_count=-1)
+    SpeakerStatistics.objects.refresh(instance.__dict__.pop('_speaker_ids', []))
+
+@receiver(post_save, sender=Speaker)
+def speaker_saved(sender, instance, created, **kwargs):
+    if created:
+        InstanceStatistics.objects.add(instance.instance_id, speaker_count=1)
+        SpeakerStatistics.objects.create(speaker=instance)
+    else:
+        # Their name and colour are shown with their speeches
+        SectionRollup.objects.touch(Speech.objects.filter(speaker=instance).values_list('section_id', flat=True).distinct())
+
+@receiver(post_delete, sender=Speaker)
+def speaker_deleted(sender, instance, **kwargs):
+    caching.cache.delete(caching.speaker_slug_key(instance.instance_id, instance.slug))
+    InstanceStatistics.objects.add(instance.instance_id, speaker_count=-1)
+
+def instance_changed(sender, instance, **kwargs):
+    """Invalidate the cached pages of the object's instance."""
+    caching.bump_version(caching.instance_namespace(instance.instance_id))
+
+for _model in ( Speech, Section, Speaker, Tag, Recording, RecordingTimestamp ):
+    post_save.connect(instance_changed, sender=_model, dispatch_uid='instance_changed_saved_%s' % _model.__name__)
+    post_delete.connect(instance_changed, sender=_model, dispatch_uid='instance_changed_deleted_%s' % _model.__name__)
+
+def _touch_speeches(speech_ids):
+    """Mark the speeches as changed, for changes (to their tags) that don't
+    save them, so that their cached fragments and the validators of the
+    pages showing them are new."""
+    speeches = Speech.objects.filter(id__in=list(speech_ids))
+    section_ids = list(speeches.values_list('section_id', flat=True).distinct())
+    speaker_ids = list(speeches.exclude(speaker=None).values_list('speaker_id', flat=True).distinct())
+    now = timezone.now()
+    speeches.update(modified=now)
+    SectionRollup.objects.touch(section_ids)
+    if speaker_ids:
+        SpeakerStatistics.objects.filter(speaker__in=speaker_ids).update(speech_modified=now)
+
+@receiver(m2m_changed, sender=Speech.tags.through)
+def speech_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # instance is a speech, or a tag if the change was made from its side
+    if action == 'pre_clear' and reverse:
+        instance._cleared_speech_ids = list(instance.speech_set.values_list('id', flat=True))
+    if action not in ( 'post_add', 'post_remove', 'post_clear' ):
+        return
+    if not reverse:
+        _touch_speeches([ instance.id ])
+    elif action == 'post_clear':
+        _touch_speeches(instance.__dict__.pop('_cleared_speech_ids', []))
+    else:
+        _touch_speeches(pk_set or [])
+    instance_changed(sender, instance)
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        _touch_speeches(instance.speech_set.values_list('id', flat=True))
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleting(sender, instance, **kwargs):
+    # Its speeches lose it without m2m_changed being sent
+    _touch_speeches(instance.speech_set.values_list('id', flat=True))
+
+@receiver(post_save, sender=Person)
+def person_saved(sender, instance, **kwargs):
+    """A speaker's PopIt person's image is shown with their speeches, so
+    mark the speakers as changed, and their instances' pages."""
+    speakers = Speaker.objects.filter(person=instance)
+    instance_ids = list(speakers.values_list('instance_id', flat=True).distinct())
+    speakers.update(modified=timezone.now())
+    caching.bump_version(*[ caching.instance_namespace(i) for i in instance_ids ])
+
+@receiver(post_save, sender=Instance)
+@receiver(post_delete, sender=Instance)
+def instance_saved(sender, instance, **kwargs):
+    """The title and description are on every page."""
+    caching.bump_version(caching.instance_namespace(instance.id))
@@ -12,6 +12,8 @@ class HMSearchForm(SearchForm):
         sqs = super(HMSearchForm, self).search()
         sqs = sqs.models(*self.model)
         sqs = sqs.highlight()
+        # Fetch each page's objects in bulk, rather than one at a time
+        sqs = sqs.load_all()
         return sqs
 
 class SpeechForm(HMSearchForm):
@@ -50,6 +52,11 @@ class InstanceSearchView(SearchView):
         self.searchqueryset = sqs
         return super(InstanceSearchView, self).build_form(*args, **kwargs)
 
+    def build_page(self):
+        paginator, page = super(InstanceSearchView, self).build_page()
+        Section.objects.resolve_paths([ r.object for r in page.object_list if r.object ])
+        return paginator, page
+
     def extra_context(self):
         if not self.query:
             return {}
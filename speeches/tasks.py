@@ -2,12 +2,15 @@ import tempfile
 import os
 
 from celery import task
+from celery.schedules import crontab
+from celery.task import periodic_task
 from celery.utils.log import get_task_logger
 
 from django.conf import settings
 
-from speeches.models import Speech
-from speeches.utils import TranscribeHelper, TranscribeException, AudioHelper, AudioException
+from speeches.models import Speech, Recording, InstanceStatistics, SpeakerStatistics, \
+    AUDIO_CONVERTING, AUDIO_READY, AUDIO_FAILED
+from speeches.utils import TranscribeHelper, TranscribeException, AudioHelper, AudioException, mp3
 
 logger = get_task_logger(__name__)
 
@@ -29,7 +32,12 @@ def transcribe_speech(speech_id):
         # Make an 8khz version of the audio using ffmpeg
         tmp_filename = None
         try:
-            tmp_filename = audio_helper.make_wav(speech.audio.path)
+            if speech.audio:
+                tmp_filename = audio_helper.make_wav(speech.audio.path)
+            else:
+                # Just the speech's piece of its recording
+                tmp_filename = audio_helper.make_wav(speech.recording.audio.path,
+                    speech.recording_start, speech.recording_duration)
             transcription = transcribe_helper.get_transcription(tmp_filename)
             # Save the result into the DB
             speech.text = transcription
@@ -53,3 +61,63 @@ def transcribe_speech(speech_id):
         # TODO - would this work in the case of a retry?
         speech.celery_task_id = None
         speech.save()
+
+@task()
+def convert_speech_audio(speech_id):
+    """Celery task to convert a speech's uploaded audio to an mp3, then
+    transcribe it if it has no text"""
+    Speech.objects.filter(id=speech_id).update(audio_status=AUDIO_CONVERTING)
+    speech = Speech.objects.get(id=speech_id)
+    try:
+        speech.convert_audio()
+        speech.audio_status = AUDIO_READY
+    except Exception:
+        # Whatever went wrong, don't leave it looking as if it's still going
+        logger.exception("Could not convert the audio of speech {0}".format(speech_id))
+        speech.audio_status = AUDIO_FAILED
+    speech.save()
+
+    if speech.audio_status == AUDIO_READY:
+        speech.start_transcribing()
+
+@task()
+def process_recording(recording_id):
+    """Celery task to convert a recording's audio to an mp3, make its seek
+    table and measure it, if that hasn't been done yet, then (re)make its
+    speeches from its timestamps and transcribe the new ones"""
+    recording = Recording.objects.get(id=recording_id)
+    if recording.audio_status != AUDIO_READY:
+        Recording.objects.filter(id=recording_id).update(audio_status=AUDIO_CONVERTING)
+        try:
+            recording.convert_audio()
+            try:
+                # The seek table is made once, here, for measuring, cutting
+                # and serving the recording
+                recording.audio_duration = int(round(mp3.write_seek_table(recording.audio.path).duration))
+            except mp3.MP3Exception:
+                recording.audio_duration = AudioHelper().get_audio_duration(recording.audio.path)
+            recording.audio_status = AUDIO_READY
+        except Exception:
+            # Whatever went wrong, don't leave it looking as if it's still going
+            logger.exception("Could not convert the audio of recording {0}".format(recording_id))
+            recording.audio_status = AUDIO_FAILED
+        recording.save()
+        if recording.audio_status == AUDIO_FAILED:
+            return
+
+    speeches = recording.create_or_update_speeches(recording.instance)
+    for speech in speeches:
+        speech.start_transcribing()
+
+@periodic_task(run_every=crontab(hour=3, minute=30))
+def refresh_instance_statistics():
+    """Celery task to work out every instance's statistics from scratch,
+    in case any changes have been missed by the save and delete hooks"""
+    InstanceStatistics.objects.refresh()
+
+@periodic_task(run_every=crontab(hour=3, minute=45))
+def refresh_speaker_statistics():
+    """Celery task to work out every speaker's statistics from scratch,
+    as changes that don't go through a speech's save or delete, such as
+    deleting a section, aren't otherwise picked up"""
+    SpeakerStatistics.objects.refresh()
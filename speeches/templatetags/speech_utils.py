@@ -3,6 +3,8 @@ from django.template.defaultfilters import stringfilter
 from django.utils.html import linebreaks
 from django.utils.safestring import mark_safe, SafeData
 
+from speeches.fragments import render_speeches
+
 register = template.Library()
 
 @register.filter(needs_autoescape=True)
@@ -12,3 +14,14 @@ def linebreaks_with_lead(value, autoescape=None):
     out = linebreaks(value, autoescape)
     out = out.replace('<p>', '<p class="lead">', 1)
     return mark_safe(out)
+
+@register.simple_tag(takes_context=True)
+def speech_fragments(context, speeches, **flags):
+    """Include speeches/speech.html for each of speeches with flags, using
+    the cached rendering of those that haven't changed."""
+    return mark_safe(u''.join(render_speeches(context, list(speeches), **flags)))
+
+@register.simple_tag(takes_context=True)
+def speech_fragment(context, speech, **flags):
+    """As speech_fragments, for one speech (e.g. in a loop of other things)."""
+    return render_speeches(context, [ speech ], **flags)[0]
@@ -6,13 +6,16 @@ import tempfile
 import filecmp
 from datetime import timedelta
 
+from mock import patch
+
 from django.core.files import File
 from django.utils import timezone
 
 from instances.tests import InstanceTestCase
 
 import speeches
-from speeches.utils import AudioHelper
+from speeches.utils import AudioHelper, mp3
+from speeches.utils.duration import probe_duration
 from speeches.models import Recording, RecordingTimestamp, Speaker
 
 def strip_kbps_from_file_info(s):
@@ -132,8 +135,110 @@ class AudioHelperTests(InstanceTestCase):
         for i in range(3):
             self.assertSameAudioLength(files_created[i], self.expected_output_file(files[i]))
 
+    def test_recording_splitting_in_parallel(self):
+        start = timezone.now()
+        timestamps = [ RecordingTimestamp.objects.create(timestamp=start + timedelta(seconds=s), instance=self.instance)
+            for s in (0, 3, 4) ]
+
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        recording = Recording.objects.create(audio=File(audio, 'lamb.mp3'), instance=self.instance, start_datetime=start)
+        for timestamp in timestamps:
+            recording.timestamps.add(timestamp)
+
+        # As if there were no seek table, and the single run of ffmpeg
+        # couldn't make every piece
+        with patch.object(mp3, 'get_seek_table', side_effect=mp3.MP3Exception), \
+                patch.object(AudioHelper, 'make_segmented_mp3s', return_value=[]):
+            files_created = self.helper.split_recording(recording, processes=3)
+
+        self.assertEquals(len(files_created), 3)
+        files = [ 'lamb_first_three_seconds.mp3', 'lamb_from_three_to_four_seconds.mp3', 'lamb_from_four_seconds_onwards.mp3' ]
+        for i in range(3):
+            self.assertSameAudioLength(files_created[i], self.expected_output_file(files[i]))
+
+    def test_recording_splitting_timestamps_after_start(self):
+        # As when the first timestamp has been deleted
+        start = timezone.now()
+        timestamps = [ RecordingTimestamp.objects.create(timestamp=start + timedelta(seconds=s), instance=self.instance)
+            for s in (1, 3) ]
+
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        recording = Recording.objects.create(audio=File(audio, 'lamb.mp3'), instance=self.instance, start_datetime=start)
+        for timestamp in timestamps:
+            recording.timestamps.add(timestamp)
+
+        whole = audioread.ffdec.FFmpegAudioFile(self.expected_output_file('lamb_whole.mp3')).duration
+        # From the seek table, and from the single run of ffmpeg without one
+        for seek_table in ( True, False ):
+            if seek_table:
+                files_created = self.helper.split_recording(recording)
+            else:
+                with patch.object(mp3, 'get_seek_table', side_effect=mp3.MP3Exception):
+                    files_created = self.helper.split_recording(recording)
+
+            self.assertEquals(len(files_created), 2)
+            durations = [ audioread.ffdec.FFmpegAudioFile(f).duration for f in files_created ]
+            self.assertAlmostEqual(durations[0], 2, delta=0.2)
+            self.assertAlmostEqual(durations[1], whole - 3, delta=0.2)
+
+    def test_recording_splitting_without_seek_table(self):
+        start = timezone.now()
+        timestamps = [ RecordingTimestamp.objects.create(timestamp=start + timedelta(seconds=s), instance=self.instance)
+            for s in (0, 3, 4) ]
+
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        recording = Recording.objects.create(audio=File(audio, 'lamb.mp3'), instance=self.instance, start_datetime=start)
+        for timestamp in timestamps:
+            recording.timestamps.add(timestamp)
+
+        # If the frames can't be read, ffmpeg cuts all the pieces in one run
+        with patch.object(mp3, 'get_seek_table', side_effect=mp3.MP3Exception), \
+                patch.object(AudioHelper, 'make_partial_mp3') as make_partial_mp3:
+            files_created = self.helper.split_recording(recording)
+
+        self.assertFalse(make_partial_mp3.called)
+        self.assertEquals(len(files_created), 3)
+        files = [ 'lamb_first_three_seconds.mp3', 'lamb_from_three_to_four_seconds.mp3', 'lamb_from_four_seconds_onwards.mp3' ]
+        for i in range(3):
+            self.assertSameAudioLength(files_created[i], self.expected_output_file(files[i]))
+
     def test_audio_length(self):
         audio_path = os.path.join(self._in_fixtures, 'lamb.mp3')
         duration = self.helper.get_audio_duration(audio_path)
         self.assertEquals( duration, 5 )
         
+
+    def test_audio_length_from_headers(self):
+        # The formats with durations in their headers don't need ffmpeg
+        for filename in ('lamb.mp3', 'lamb.ogg', 'lamb_iphone.wav', 'lamb_stereo.wav'):
+            audio_path = os.path.join(self._in_fixtures, filename)
+            duration = probe_duration(audio_path)
+            self.assertAlmostEqual( duration, audioread.ffdec.FFmpegAudioFile(audio_path).duration, delta=0.2 )
+            with patch.object(audioread.ffdec, 'FFmpegAudioFile') as ffmpeg:
+                self.assertEquals( self.helper.get_audio_duration(audio_path), 5 )
+            self.assertFalse( ffmpeg.called )
+
+        # The ones without fall back to it
+        audio_path = os.path.join(self._in_fixtures, 'lamb.3gp')
+        self.assertEquals( probe_duration(audio_path), None )
+        self.assertEquals( self.helper.get_audio_duration(audio_path),
+            round(audioread.ffdec.FFmpegAudioFile(audio_path).duration) )
+
+    def test_mp3_seek_table(self):
+        audio_path = os.path.join(self._in_fixtures, 'lamb.mp3')
+        table = mp3.SeekTable.from_mp3(audio_path)
+        self.assertAlmostEqual( table.duration, 5, delta=0.2 )
+        self.assertEquals( table.offsets[-1], os.path.getsize(audio_path) )
+
+        # Pieces meet at a frame boundary
+        first, end = table.byte_range(0, 2)
+        self.assertEquals( first, table.offsets[0] )
+        self.assertEquals( table.byte_range(2), (end, table.offsets[-1]) )
+        self.assertTrue( end in table.offsets )
+
+        # Stored and loaded again
+        loaded = mp3.SeekTable.loads(table.dumps())
+        self.assertEquals( loaded.offsets, table.offsets )
+        self.assertEquals( loaded.samples, table.samples )
+        self.assertEquals( loaded.sample_rate, table.sample_rate )
+        self.assertRaises( mp3.MP3Exception, mp3.SeekTable.loads, table.dumps()[:-1] )
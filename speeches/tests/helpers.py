@@ -1,7 +1,11 @@
 from datetime import datetime, date, time, timedelta
+from functools import wraps
 
+from django.core.cache import get_cache
 from django.test import TestCase
+from django.test.utils import override_settings
 
+from speeches import caching
 from speeches.models import Section, Speech
 from instances.models import Instance
 
@@ -10,6 +14,30 @@ class ParentInstanceMismatchError(Exception):
     pass
 
 
+LOCMEM_CACHES = { 'default': { 'BACKEND': 'django.core.cache.backends.locmem.LocMemCache' } }
+
+def with_locmem_cache(**settings):
+    """
+    Decorate a test to run with an empty in-memory cache as the default one
+    (the dummy cache is used in development), overriding any other settings
+    given too. speeches.caching holds on to the cache it was imported with,
+    so that's swapped for the test as well.
+    """
+    def decorator(test):
+        @wraps(test)
+        @override_settings(CACHES=LOCMEM_CACHES, **settings)
+        def wrapped(*args, **kwargs):
+            old_cache = caching.cache
+            caching.cache = get_cache('default')
+            caching.cache.clear()
+            try:
+                return test(*args, **kwargs)
+            finally:
+                caching.cache = old_cache
+        return wrapped
+    return decorator
+
+
 def create_sections( subsections, parent=None, instance=None):
     """
     Create a hierachy of sections and speeches. Very useful for setting up test data as needed.
@@ -91,6 +91,9 @@ class ImportJsonTests(InstanceTestCase):
 
             speeches = section.speech_set.all()
 
+            # Numbered in order once they were all made
+            self.assertEqual( [ s.position for s in speeches.order_by('id') ], range(1, len(speeches) + 1) )
+
             # Check that all speeches have the correct privacy setting
             for speech in speeches:
                 self.assertEqual(speech.public, expected["is_public"])
@@ -12,6 +12,7 @@ from instances.tests import InstanceTestCase
 
 import speeches
 from speeches.models import Speech, Speaker, Recording, RecordingTimestamp
+from speeches.tasks import process_recording
 
 @override_settings(MEDIA_ROOT=tempfile.mkdtemp())
 class RecordingAPITests(InstanceTestCase):
@@ -53,7 +54,11 @@ class RecordingAPITests(InstanceTestCase):
         response_content = simplejson.loads(resp.content)
         self.assertTrue(".mp3" in response_content['fields']['audio'])
 
-        # Check in db
+        # Check in db, once the celery task has measured it
+        self.assertEquals(recording.audio_status, 'pending')
+        process_recording(recording.id)
+        recording = Recording.objects.get(id=recording.id)
+        self.assertEquals(recording.audio_status, 'ready')
         self.assertIsNotNone(recording.audio)
         self.assertEquals(recording.audio_duration, 5)
 
@@ -120,10 +125,12 @@ class RecordingAPITests(InstanceTestCase):
 
         # Check response JSON
         response_content = simplejson.loads(resp.content)
-        self.assertTrue(".mp3" in response_content['fields']['audio'])
+        self.assertTrue(os.path.splitext(filename)[1] in response_content['fields']['audio'])
 
-        # Check in db
+        # Check in db, once the celery task has converted and split it
         # Check the recording
+        process_recording(recording.id)
+        recording = Recording.objects.get(id=recording.id)
         self.assertIsNotNone(recording.audio)
         self.assertRegexpMatches(recording.audio.path, r'\.mp3$')
 
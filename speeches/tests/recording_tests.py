@@ -12,6 +12,9 @@ from instances.tests import InstanceTestCase
 
 import speeches
 from speeches.models import Speech, Recording, Section
+from speeches.tasks import process_recording
+from speeches.tests import with_locmem_cache
+from speeches.utils import mp3
 
 logging.disable(logging.WARNING)
 
@@ -47,6 +50,8 @@ class RecordingTests(InstanceTestCase):
             'timestamps': timestamps
         })
 
+        # The speeches are made by a celery task
+        process_recording(Recording.objects.order_by('-id')[0].id)
         recording = Recording.objects.order_by('-id')[0]
         self.assertIsNotNone(recording.audio)
         self.assertEquals(recording.audio_duration, 5)
@@ -83,6 +88,7 @@ class RecordingTests(InstanceTestCase):
             args['timestamps-%d-recording' % i] = recording.id
             args['timestamps-%d-timestamp' % i] = new[i]
         resp = self.client.post('/recording/%s/edit' % recording.id, args)
+        process_recording(recording.id)
 
         # Now test the speeches are differently spaced apart
         last_start = None
@@ -92,3 +98,96 @@ class RecordingTests(InstanceTestCase):
             if last_start:
                 self.assertEqual(start - last_start, timedelta(seconds=diffs[i]))
             last_start = start
+
+    def test_edit_recording_timestamps_before_processing(self):
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        self.client.post('/api/v0.1/recording/', {
+            'audio': audio,
+            'timestamps': '[{"timestamp":946684800000},{"timestamp":946684802000}]'
+        })
+        recording = Recording.objects.order_by('-id')[0]
+        self.assertEquals(recording.audio_duration, 0)
+
+        # Its length isn't known yet, so can't be checked against
+        timestamps = list(recording.timestamps.all())
+        args = {
+            "timestamps-TOTAL_FORMS": 2,
+            "timestamps-INITIAL_FORMS": 2,
+        }
+        for i, t in enumerate(timestamps):
+            args['timestamps-%d-id' % i] = t.id
+            args['timestamps-%d-recording' % i] = recording.id
+            args['timestamps-%d-timestamp' % i] = i * 3
+        resp = self.client.post('/recording/%s/edit' % recording.id, args)
+        self.assertEquals(resp.status_code, 302)
+
+    @override_settings(SPEECH_AUDIO_FROM_RECORDINGS=True)
+    def test_speech_audio_from_recording(self):
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        resp = self.client.post('/api/v0.1/recording/', {
+            'audio': audio,
+            'timestamps': '[{"timestamp":946684800000},{"timestamp":946684802000}]'
+        })
+        recording = Recording.objects.order_by('-id')[0]
+        process_recording(recording.id)
+
+        # Its seek table was made and stored, and measured it
+        self.assertTrue(os.path.exists(mp3.seek_table_path(recording.audio.path)))
+        self.assertEquals(Recording.objects.get(id=recording.id).audio_duration, 5)
+
+        # The speeches have no audio files of their own
+        speeches = list(Speech.objects.order_by('start_time'))
+        self.assertEquals(len(speeches), 2)
+        self.assertEquals([ (s.recording_id, s.recording_start, s.recording_duration) for s in speeches ],
+            [ (recording.id, 0, 2), (recording.id, 2, None) ])
+        self.assertFalse(speeches[0].audio)
+        self.assertEquals(speeches[0].audio_url, '/speech/%d/audio.mp3' % speeches[0].id)
+
+        # Their audio is served from frame boundaries in the recording
+        resp = self.client.get('/speech/%d/audio.mp3' % speeches[0].id)
+        self.assertEquals(resp.status_code, 200)
+        self.assertEquals(resp['Content-Type'], 'audio/mpeg')
+        whole = resp.content
+        self.assertEquals(int(resp['Content-Length']), len(whole))
+        self.assertEquals(ord(whole[0]), 0xFF)
+        with open(recording.audio.path, 'rb') as f:
+            self.assertTrue(whole in f.read())
+
+        resp = self.client.get('/speech/%d/audio.mp3' % speeches[0].id, HTTP_RANGE='bytes=100-199')
+        self.assertEquals(resp.status_code, 206)
+        self.assertEquals(resp['Content-Range'], 'bytes 100-199/%d' % len(whole))
+        self.assertEquals(resp.content, whole[100:200])
+
+        resp = self.client.get('/speech/%d/audio.mp3' % speeches[0].id, HTTP_RANGE='bytes=%d-' % len(whole))
+        self.assertEquals(resp.status_code, 416)
+
+    @with_locmem_cache(CACHE_MIDDLEWARE_SECONDS=60, SPEECH_AUDIO_FROM_RECORDINGS=True)
+    def test_speech_audio_not_page_cached(self):
+        audio = open(os.path.join(self._in_fixtures, 'lamb.mp3'), 'rb')
+        resp = self.client.post('/api/v0.1/recording/', {
+            'audio': audio,
+            'timestamps': '[{"timestamp":946684800000},{"timestamp":946684802000}]'
+        })
+        process_recording(Recording.objects.order_by('-id')[0].id)
+        speech = Speech.objects.order_by('start_time')[0]
+        Speech.objects.filter(id=speech.id).update(public=True)
+        url = '/speech/%d/audio.mp3' % speech.id
+
+        self.client.logout()
+        resp = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEquals(resp.status_code, 200)
+        self.assertNotEquals(resp.get('Content-Encoding'), 'gzip')
+        whole = resp.content
+        self.assertEquals(int(resp['Content-Length']), len(whole))
+        self.assertEquals(ord(whole[0]), 0xFF)
+
+        resp = self.client.get(url, HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=100-199')
+        self.assertEquals(resp.status_code, 206)
+        self.assertNotEquals(resp.get('Content-Encoding'), 'gzip')
+        self.assertEquals(resp.content, whole[100:200])
+
+        # Not served from the page cache after a quiet change
+        Speech.objects.filter(id=speech.id).update(recording_duration=1)
+        resp = self.client.get(url)
+        self.assertEquals(resp.status_code, 200)
+        self.assertTrue(len(resp.content) < len(whole))
@@ -12,6 +12,7 @@ from instances.tests import InstanceTestCase
 
 import speeches
 from speeches.models import Speech, Speaker, Recording, RecordingTimestamp
+from speeches.tasks import process_recording
 from speeches.utils import AudioHelper
 
 import logging
@@ -44,6 +45,8 @@ class RecordingTimestampTests(InstanceTestCase):
 
         def check_response(resp, expected_code=201, expected_type='application/json'):
             recording = Recording.objects.order_by('-id')[0]
+            # The speeches are (re)made by a celery task
+            process_recording(recording.id)
             # Check response headers
             self.assertEquals(resp.status_code, expected_code)
             self.assertEquals(resp['Content-Type'], expected_type)
@@ -215,6 +218,7 @@ class RecordingTimestampTests(InstanceTestCase):
 
         recording = Recording.objects.order_by('-id')[0]
         self.assertEquals(resp.status_code, 201)
+        process_recording(recording.id)
 
         resp = self.client.get('/recording/%d/edit' % recording.id)
         self.assertEquals(resp.status_code, 200)
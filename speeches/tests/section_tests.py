@@ -2,8 +2,10 @@ from datetime import datetime, date, time, timedelta
 
 from django.test import TestCase
 
-from speeches.models import Section, Speech
-from speeches.tests import create_sections
+from speeches import caching
+from speeches.models import Section, SectionMoveException, SectionPath, SectionRollup, Speech
+from speeches.tests import create_sections, with_locmem_cache
+from speeches.views import SectionView
 from instances.models import Instance
 from instances.tests import InstanceTestCase
 
@@ -105,6 +107,20 @@ class SectionModelTests(TestCase):
         self.assertEqual( debs[0].get_next_node(), debs[1] )
         self.assertEqual( debs[1].get_next_node(), e )
 
+        # One query each, and remembered
+        dept = Section.objects.get(id=depts[1].id)
+        with self.assertNumQueries(1):
+            self.assertEqual( dept.get_next_node(), depts[2] )
+            self.assertEqual( dept.get_next_node(), depts[2] )
+
+        # An earlier speech reorders the departments, and Aardvarks (with no
+        # dated speeches) moves with the earliest time in the tree
+        aardvarks, walks, other = depts
+        Speech.objects.create(instance=other.instance, section=other, text='Early', start_date=date(2013, 3, 1))
+        other = Section.objects.get(id=other.id)
+        self.assertEqual( other.get_previous_node(), aardvarks )
+        self.assertEqual( other.get_next_node(), walks )
+
     def test_section_speech_next_previous(self):
         first_next = Section.objects.get(title='Bill on Silly Walks').speech_set.all()[0]
         speeches = Section.objects.get(title='Oral Answers to Questions - Silly Walks').speech_set.all()
@@ -120,6 +136,36 @@ class SectionModelTests(TestCase):
         self.assertEqual( speeches[0].get_previous_speech(), p )
         self.assertEqual( speeches[0].get_next_speech(), q )
 
+    def test_speech_positions(self):
+        section = Section.objects.get(title='Bill on Silly Walks')
+        other = Section.objects.get(title='Oral Answers to Questions - Silly Walks')
+        self.assertEqual( [ s.position for s in section.speech_set.all() ], [ 1, 2 ] )
+
+        # Inserting in the middle shifts the later ones along
+        middle = Speech.objects.create(instance=section.instance, section=section, text='Middle',
+            start_date=date(2013, 3, 25), start_time=time(12, 5))
+        self.assertEqual( middle.position, 2 )
+        self.assertEqual( [ s.position for s in section.speech_set.all() ], [ 1, 2, 3 ] )
+        self.assertEqual( [ s.text for s in section.speech_set.order_by('position') ][1], 'Middle' )
+
+        # Moving it closes the gap, and it goes on the end of the other
+        middle.section = other
+        middle.save()
+        self.assertEqual( [ s.position for s in section.speech_set.all() ], [ 1, 2 ] )
+        self.assertEqual( Speech.objects.get(id=middle.id).position, 5 )
+
+        # As does deleting
+        section.speech_set.all()[0].delete()
+        self.assertEqual( [ s.position for s in section.speech_set.all() ], [ 1 ] )
+
+        # Saving without moving keeps the place others have shifted it to
+        last = section.speech_set.get()
+        Speech.objects.create(instance=section.instance, section=section, text='Early',
+            start_date=date(2013, 3, 25), start_time=time(11, 0))
+        last.text = 'Changed'
+        last.save()
+        self.assertEqual( Speech.objects.get(id=last.id).position, 2 )
+
     def test_section_descendant_speeches_queryset(self):
         top_level = Section.objects.get(title='Government Written Answers')
 
@@ -132,6 +178,128 @@ class SectionModelTests(TestCase):
         on_test_date = speeches.filter(start_date=test_date)
         self.assertEqual(on_test_date.count(), 2)
 
+    def test_section_tree_paths(self):
+        top_level = Section.objects.get(title='Government Debates')
+        friday = Section.objects.get(title='Friday 29th March')
+        clause = Section.objects.get(title='Z Clause')
+        self.assertEqual(top_level.depth, 0)
+        self.assertEqual(clause.depth, 3)
+        self.assertTrue(clause.tree_path.startswith(friday.tree_path))
+        self.assertEqual(
+            [ s.title for s in clause.get_ancestors ],
+            [ 'Government Debates', 'Friday 29th March', 'Fixed Easter Bill', 'Z Clause' ]
+        )
+
+        # Moving a section moves its whole subtree
+        written = Section.objects.get(title='Government Written Answers')
+        friday.parent = written
+        friday.save()
+        clause = Section.objects.get(title='Z Clause')
+        self.assertTrue(clause.tree_path.startswith(written.tree_path))
+        self.assertEqual(clause.depth, 3)
+        self.assertEqual(written.descendant_speeches().count(), 14)
+        self.assertEqual(top_level.descendant_speeches().count(), 6)
+
+    def test_section_rollups(self):
+        top_level = Section.objects.get(title='Government Debates')
+        rollup = top_level.rollup
+        self.assertEqual(rollup.speech_count, 0)
+        self.assertEqual(rollup.subtree_speech_count, 14)
+        self.assertEqual(rollup.subtree_earliest(), datetime(2013, 3, 25, 9, 0))
+        self.assertEqual(rollup.subtree_latest(), datetime(2013, 3, 29, 15, 10))
+
+        # Moving a speech updates both sides
+        else_section = Section.objects.get(title='Ministry of Something Else')
+        speech = Speech.objects.filter(section__title='Z Clause')[0]
+        speech.section = else_section
+        speech.save()
+        self.assertEqual(SectionRollup.objects.get(pk=top_level.id).subtree_speech_count, 13)
+        written = Section.objects.get(title='Government Written Answers')
+        self.assertEqual(written.rollup.subtree_speech_count, 7)
+        self.assertEqual(Section.objects.get(id=else_section.id).rollup.speech_count, 1)
+
+        speech.delete()
+        written = Section.objects.get(title='Government Written Answers')
+        self.assertEqual(written.rollup.subtree_speech_count, 6)
+
+    def test_section_move_to(self):
+        friday = Section.objects.get(title='Friday 29th March')
+        bill = Section.objects.get(title='Fixed Easter Bill')
+        self.assertRaises(SectionMoveException, friday.move_to, friday)
+        self.assertRaises(SectionMoveException, friday.move_to, bill)
+
+        # Moving somewhere with a section of the same slug renames it
+        walks = Section.objects.get(title='Ministry of Silly Walks')
+        Section.objects.create(instance=walks.instance, title='March', parent=walks)
+        march = Section.objects.get(title='March', parent__title='Ministry of Aardvarks')
+        march.move_to(walks)
+        march = Section.objects.get(id=march.id)
+        self.assertEqual(march.slug, 'march-2')
+        self.assertEqual(march.depth, 2)
+        self.assertEqual(march.get_path, 'government-written-answers/ministry-of-silly-walks/march-2')
+        self.assertEqual(SectionRollup.objects.get(pk=walks.id).subtree_speech_count, 6)
+
+        # A whole subtree, to the top level
+        stale_clause = Section.objects.get(title='Z Clause')
+        bill.move_to(None)
+        clause = Section.objects.get(title='Z Clause')
+        self.assertEqual(clause.depth, 1)
+        self.assertEqual(clause.get_path, 'fixed-easter-bill/z-clause')
+        self.assertEqual(SectionRollup.objects.get(pk=friday.id).subtree_speech_count, 0)
+
+        # From a stale copy, next to a section of the same slug in another instance
+        other_instance = Instance.objects.create(label='other')
+        Section.objects.create(instance=other_instance, title='Z Clause')
+        stale_clause.move_to(None)
+        clause = Section.objects.get(id=clause.id)
+        self.assertEqual(clause.get_path, 'z-clause')
+        self.assertEqual(clause.depth, 0)
+        self.assertFalse(Section.objects.filter(tree_path__startswith=bill.tree_path, id=clause.id).exists())
+
+    def test_section_resolve_paths(self):
+        speeches = list(Speech.objects.filter(section__isnull=False).order_by('id'))
+        with self.assertNumQueries(1):
+            Section.objects.resolve_paths(speeches)
+        with self.assertNumQueries(0):
+            paths = [ speech.section.get_path for speech in speeches ]
+            ancestors = [ speech.section.get_ancestors for speech in speeches ]
+        self.assertEqual(paths[0], 'government-debates/monday-25th-march/oral-answers-to-questions-silly-walks')
+        self.assertEqual(
+            [ s.title for s in ancestors[0] ],
+            [ 'Government Debates', 'Monday 25th March', 'Oral Answers to Questions - Silly Walks' ]
+        )
+
+    @with_locmem_cache()
+    def test_section_forest(self):
+        clause = Section.objects.get(title='Z Clause')
+        written = Section.objects.get(title='Government Written Answers')
+        Section.objects.get(title='Fixed Easter Bill').get_ancestors # Load the forest
+        with self.assertNumQueries(0):
+            self.assertEqual(clause.get_path, 'government-debates/friday-29th-march/fixed-easter-bill/z-clause')
+            self.assertEqual(
+                [ s.title for s in written.get_children ],
+                [ 'Ministry of Aardvarks', 'Ministry of Silly Walks', 'Ministry of Something Else' ]
+            )
+            self.assertTrue(written.get_children[2].is_leaf_node())
+            self.assertFalse(written.is_leaf_node())
+
+        # Changing the sections invalidates it
+        Section.objects.create(instance=written.instance, title='Elsewhere', parent=written.get_children[2])
+        written = Section.objects.get(id=written.id)
+        self.assertFalse(written.get_children[2].is_leaf_node())
+
+        # But new speeches only do if they change the order
+        version = caching.get_version(caching.sections_namespace(written.instance_id))
+        bill = Section.objects.get(title='Fixed Easter Bill')
+        Speech.objects.create(instance=bill.instance, section=Section.objects.get(title='New Clause 1'),
+            start_date=date(2013, 3, 29), start_time=time(13, 0))
+        self.assertEqual(caching.get_version(caching.sections_namespace(written.instance_id)), version)
+        Speech.objects.create(instance=bill.instance, section=Section.objects.get(title='Z Clause'),
+            start_date=date(2013, 3, 29), start_time=time(13, 30))
+        self.assertNotEqual(caching.get_version(caching.sections_namespace(written.instance_id)), version)
+        bill = Section.objects.get(id=bill.id)
+        self.assertEqual([ s.title for s in bill.get_children ], [ 'New Clause 1', 'Z Clause', 'Clause 1' ])
+
     def test_section_get_or_create_with_parents(self):
 
         instance, _ = Instance.objects.get_or_create(label='get-or-create-with-parents')
@@ -157,6 +325,53 @@ class SectionModelTests(TestCase):
         self.assertEqual(bundy_section.title, "Bundy")
         self.assertEqual(bundy_section.parent, bar_section)
 
+        # Many at once
+        paths = [ ("Foo", "Bar", "Baz"), ("Foo", "Qux"), ("Foo", "Qux", "Quux") ]
+        sections = Section.objects.get_or_create_many_with_parents(instance=instance, paths=paths)
+        self.assertEqual(sections[("Foo", "Bar", "Baz")], baz_section)
+        self.assertEqual(sections[("Foo", "Qux")].parent, foo_section)
+        self.assertEqual(sections[("Foo", "Qux", "Quux")].parent, sections[("Foo", "Qux")])
+
+        # Which, if they all exist, is a single query
+        with self.assertNumQueries(1):
+            sections = Section.objects.get_or_create_many_with_parents(instance=instance, paths=paths)
+        self.assertEqual(sections[("Foo", "Bar", "Baz")], baz_section)
+
+        # New ones are made as if saved one at a time, with clashing slugs numbered
+        paths = [ ("Foo", "Qux!", "Corge"), ("Foo", "Qux?"), ("Grault", "Garply") ]
+        sections = Section.objects.get_or_create_many_with_parents(instance=instance, paths=paths)
+        corge = sections[("Foo", "Qux!", "Corge")]
+        self.assertEqual(corge.parent.slug, 'qux-2')
+        self.assertEqual(sections[("Foo", "Qux?")].slug, 'qux-3')
+        self.assertEqual(corge.tree_path, Section.objects.get(id=corge.id).tree_path)
+        self.assertEqual(corge.depth, 2)
+        self.assertEqual(corge.get_path, 'foo/qux-2/corge')
+        self.assertEqual(SectionPath.objects.resolve(instance, 'foo/qux-2/corge'), (corge, True))
+        self.assertEqual(SectionPath.objects.resolve(instance, 'grault/garply'), (sections[("Grault", "Garply")], True))
+        self.assertTrue(SectionRollup.objects.get(section=corge).subtree_modified)
+        self.assertEqual(Section.objects.get(id=corge.id).sort_key[:11], foo_section.tree_path)
+
+    def test_section_get_or_create_many_matches_one_at_a_time(self):
+        paths = [ ("Foo", "Qux"), ("Foo", "Qux!", "Corge") ]
+        one_instance = Instance.objects.create(label='one-at-a-time')
+        for path in paths:
+            Section.objects.get_or_create_with_parents(instance=one_instance, titles=path)
+        many_instance = Instance.objects.create(label='many-at-once')
+        Section.objects.get_or_create_many_with_parents(instance=many_instance, paths=paths)
+
+        def state(instance):
+            out = []
+            for section in Section.objects.filter(instance=instance).order_by('sort_key'):
+                self.assertEqual(section.tree_path, '%s%010d/' % (section.parent.tree_path if section.parent else '', section.id))
+                self.assertTrue(SectionRollup.objects.get(section=section).subtree_modified)
+                out.append((
+                    section.title, section.slug, section.depth, section.get_path,
+                    SectionPath.objects.resolve(instance, section.get_path) == (section, True),
+                    [ (s.slug, s.redirect) for s in section.slugs.all() ],
+                ))
+            return out
+        self.assertEqual(state(many_instance), state(one_instance))
+
 
 class SectionSiteTests(InstanceTestCase):
     """Tests for the section functionality"""
@@ -200,6 +415,56 @@ class SectionSiteTests(InstanceTestCase):
         resp = self.client.get('/sections/%d' % subsection.id)
         self.assertSequenceEqual([(speech, {'speech':True, 'new_level': True, 'closed_levels': [1]})], list(resp.context['section_tree']))
 
+    def test_section_page_in_windows(self):
+        section = Section.objects.create(title='A big section', instance=self.instance)
+        speeches = [ Speech.objects.create(text='Speech %d' % i, section=section, instance=self.instance,
+            start_date=date(2013, 3, 25), start_time=time(9, i)) for i in range(5) ]
+        sub = Section.objects.create(title='A subsection', parent=section, instance=self.instance)
+        subsub = Section.objects.create(title='A subsubsection', parent=sub, instance=self.instance)
+        Speech.objects.create(text='A sub speech', section=subsub, instance=self.instance,
+            start_date=date(2013, 3, 25), start_time=time(9, 2, 30))
+
+        paginate_by = SectionView.paginate_by
+        SectionView.paginate_by = 4
+        try:
+            resp = self.client.get('/sections/%d' % section.id)
+            self.assertSequenceEqual([
+                (speeches[0], {'speech': True, 'new_level': True}),
+                (speeches[1], {'speech': True}),
+                (speeches[2], {'speech': True}),
+                (sub, {'closed_levels': [1]}),
+            ], resp.context['section_tree'])
+
+            # The next window reopens the subsection it starts within
+            resp = self.client.get('/sections/%d?after=%s' % (section.id, resp.context['next_cursor']))
+            self.assertSequenceEqual([
+                (sub, {'new_level': True}),
+                (subsub, {'new_level': True, 'closed_levels': [2]}),
+                (speeches[3], {'speech': True}),
+                (speeches[4], {'speech': True, 'closed_levels': [1]}),
+            ], resp.context['section_tree'])
+            self.assertEqual(resp.context['next_cursor'], None)
+        finally:
+            SectionView.paginate_by = paginate_by
+
+        resp = self.client.get('/sections/%d?after=nonsense' % section.id)
+        self.assertEqual(resp.status_code, 404)
+
+    def test_section_page_in_windows_before_1900(self):
+        section = Section.objects.create(title='A historical section', instance=self.instance)
+        speeches = [ Speech.objects.create(text='Speech %d' % i, section=section, instance=self.instance,
+            start_date=date(1850, 1, 2), start_time=time(9, i)) for i in range(3) ]
+
+        paginate_by = SectionView.paginate_by
+        SectionView.paginate_by = 2
+        try:
+            resp = self.client.get('/sections/%d' % section.id)
+            self.assertEqual([ s for s, _ in resp.context['section_tree'] ], speeches[:2])
+            resp = self.client.get('/sections/%d?after=%s' % (section.id, resp.context['next_cursor']))
+            self.assertEqual([ s for s, _ in resp.context['section_tree'] ], speeches[2:])
+        finally:
+            SectionView.paginate_by = paginate_by
+
     def test_section_page_lists_subsections(self):
         section = Section.objects.create(title='A test section', instance=self.instance)
 
@@ -259,3 +524,29 @@ class SectionSiteTests(InstanceTestCase):
         self.assertEqual(section.slug, 'a-test-section-2')
         resp = self.client.get('/a-test-section')
         self.assertContains( resp, 'Not Found', status_code=404 )
+
+    def test_section_url_paths(self):
+        top = Section.objects.create(title='Top', instance=self.instance)
+        middle = Section.objects.create(title='Middle', parent=top, instance=self.instance)
+        bottom = Section.objects.create(title='Bottom', parent=middle, instance=self.instance)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(SectionPath.objects.resolve(self.instance, 'top/middle/bottom'), (bottom, True))
+        resp = self.client.get('/top/middle/bottom')
+        self.assertEqual(resp.context['section'], bottom)
+
+        # Renaming an ancestor redirects the old URLs of the whole subtree
+        middle.slug = 'centre'
+        middle.save()
+        self.assertEqual(SectionPath.objects.resolve(self.instance, 'top/middle/bottom'), (bottom, False))
+        resp = self.client.get('/top/middle/bottom')
+        self.assertRedirects(resp, 'top/centre/bottom')
+
+        # As does moving a section, and its old URL can be used again
+        bottom.move_to(top)
+        resp = self.client.get('/top/centre/bottom')
+        self.assertRedirects(resp, 'top/bottom')
+        other = Section.objects.create(title='Bottom', parent=middle, instance=self.instance)
+        self.assertEqual(SectionPath.objects.resolve(self.instance, 'top/centre/bottom'), (other, True))
+
+        self.assertEqual(SectionPath.objects.resolve(self.instance, 'top/nowhere'), (None, False))
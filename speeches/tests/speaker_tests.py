@@ -1,8 +1,11 @@
 from instances.tests import InstanceTestCase
 
-from speeches.models import Speaker, Speech, Section
+from speeches import caching
+from speeches.models import Speaker, Speech, Section, SpeakerStatistics
+from speeches.tests import with_locmem_cache
 from popit.models import Person, ApiInstance
 
+import datetime
 import sys
 
 class SpeakerTests(InstanceTestCase):
@@ -37,6 +40,108 @@ class SpeakerTests(InstanceTestCase):
         self.assertSequenceEqual([speech], resp.context['speech_list'])
         self.assertSequenceEqual([speech], resp.context['page_obj'])
 
+    def test_speaker_page_longest_speech(self):
+        speaker = Speaker.objects.create(name='Steve', instance=self.instance)
+        short = Speech.objects.create(text="A short speech", speaker=speaker, instance=self.instance)
+        Speech.objects.create(text="A\tmuch  longer speech\n", speaker=speaker, instance=self.instance)
+        self.assertEqual( ( short.text_length, short.word_count ), ( 14, 3 ) )
+
+        resp = self.client.get('/speaker/%s' % speaker.slug)
+        longest = resp.context['longest_speech']
+        self.assertEqual( ( longest.text_length, longest.word_count ), ( 22, 4 ) )
+
+        short.text = "Now the longest speech of all"
+        short.save()
+        resp = self.client.get('/speaker/%s' % speaker.slug)
+        self.assertEqual( resp.context['longest_speech'], short )
+
+    def test_speaker_statistics(self):
+        steve = Speaker.objects.create(name='Steve', instance=self.instance)
+        bob = Speaker.objects.create(name='Bob', instance=self.instance)
+        sections = [ Section.objects.create(title='Section %d' % i, instance=self.instance) for i in range(2) ]
+        for i in range(3):
+            Speech.objects.create( text='Speech %d' % i, speaker=steve, section=sections[i % 2],
+                start_date=datetime.date(2000 + i, 1, 1), public=(i == 0), instance=self.instance )
+
+        def check(speaker, expected):
+            stats = SpeakerStatistics.objects.get(speaker=speaker)
+            self.assertEqual(
+                ( stats.speech_count, stats.public_speech_count, stats.section_count, stats.public_section_count,
+                  stats.first_speech_date and stats.first_speech_date.year, stats.last_speech_date and stats.last_speech_date.year ),
+                expected
+            )
+        check(steve, ( 3, 1, 2, 1, 2000, 2002 ))
+        check(bob, ( 0, 0, 0, 0, None, None ))
+
+        speech = Speech.objects.get(text='Speech 2')
+        speech.speaker = bob
+        speech.save()
+        check(steve, ( 2, 1, 2, 1, 2000, 2001 ))
+        check(bob, ( 1, 0, 1, 0, 2002, 2002 ))
+
+        resp = self.client.get('/speaker/%s' % steve.slug)
+        self.assertEqual( resp.context['section_count'], 2 )
+        self.assertEqual( resp.context['speech_count'], 2 )
+        resp = self.client.get('/speakers')
+        self.assertEqual( [ s.speech_count for s in resp.context['speaker_list'] ], [ 1, 2 ] )
+
+        self.client.logout()
+        resp = self.client.get('/speaker/%s' % steve.slug)
+        self.assertEqual( resp.context['section_count'], 1 )
+        self.assertEqual( resp.context['speech_count'], 1 )
+
+        # Single changes are applied as deltas, which agree with working
+        # everything out again
+        longest = Speech.objects.create( text='A much longer speech', speaker=steve, section=sections[0],
+            start_date=datetime.date(2000, 6, 1), public=False, instance=self.instance )
+        middle = Speech.objects.create( text='Mid', speaker=steve, section=sections[0],
+            start_date=datetime.date(2000, 3, 1), public=False, instance=self.instance )
+        middle.section = sections[1]
+        middle.public = True
+        middle.save()
+        middle.delete()
+        speech = Speech.objects.get(text='Speech 1')
+        speech.public = True
+        speech.save()
+        longest.section = sections[1]
+        longest.save()
+        Speech.objects.get(text='Speech 0').delete()
+        fields = ( 'speech_count', 'public_speech_count', 'section_count', 'public_section_count',
+            'first_speech_date', 'last_speech_date', 'longest_speech' )
+        applied = list(SpeakerStatistics.objects.order_by('speaker').values_list(*fields))
+        self.assertEqual(SpeakerStatistics.objects.get(speaker=steve).longest_speech, longest)
+        SpeakerStatistics.objects.refresh()
+        self.assertEqual(list(SpeakerStatistics.objects.order_by('speaker').values_list(*fields)), applied)
+        check(steve, ( 2, 1, 1, 1, 2000, 2001 ))
+
+        # Deleting a section leaves its speeches in none
+        sections[1].delete()
+        check(steve, ( 2, 1, 0, 0, 2000, 2001 ))
+
+    @with_locmem_cache()
+    def test_speaker_slug_cache(self):
+        speaker = Speaker.objects.create(name='Steve', instance=self.instance)
+        key = caching.speaker_slug_key(self.instance.id, 'steve')
+        self.assertEqual(caching.cache.get(key), speaker.id)
+
+        # A changed slug is cached, and the old one still leads to it
+        speaker.slug = 'stephen'
+        speaker.save()
+        self.assertEqual(caching.cache.get(caching.speaker_slug_key(self.instance.id, 'stephen')), speaker.id)
+        resp = self.client.get('/speaker/steve')
+        self.assertRedirects(resp, '/speaker/stephen')
+
+        # The cache is used rather than the slugs
+        other = Speaker.objects.create(name='Other', instance=self.instance)
+        caching.cache.set(key, other.id)
+        resp = self.client.get('/speaker/steve')
+        self.assertRedirects(resp, '/speaker/other')
+
+        other.delete()
+        self.assertEqual(caching.cache.get(caching.speaker_slug_key(self.instance.id, 'other')), None)
+        resp = self.client.get('/speaker/steve')
+        self.assertRedirects(resp, '/speaker/stephen')
+
     def test_speaker_page_has_button_to_add_speech(self):
         # Add a speaker
         speaker = Speaker.objects.create(name='Steve', instance=self.instance)
@@ -3,13 +3,21 @@ import tempfile
 import shutil
 import datetime
 
+from mock import patch
+
+from django.core.management import call_command
 from django.test.utils import override_settings
 from django.conf import settings
 
 from instances.tests import InstanceTestCase
+from popit.models import Person, ApiInstance
 
 import speeches
-from speeches.models import Speech, Speaker, Section
+from speeches import caching, fragments
+from speeches.models import Speech, Speaker, Section, Tag, InstanceStatistics
+from speeches.tasks import convert_speech_audio
+from speeches.tests import with_locmem_cache
+from speeches.views import SectionList
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp()
 
@@ -350,15 +358,35 @@ class SpeechTests(InstanceTestCase):
             'audio': audio
         })
 
-        # Assert that it uploads and we're told to wait
-
+        # Assert that it uploads and we're told it's being converted
         speech = Speech.objects.order_by('-id')[0]
+        self.assertEqual(speech.audio_status, 'pending')
+        self.assertIsNone(speech.celery_task_id)
+        resp = self.client.get('/speech/%d' % speech.id)
+        self.assertContains(resp, 'The audio is being converted')
+
+        # Then by the celery task, which starts transcribing it
+        convert_speech_audio(speech.id)
+        speech = Speech.objects.get(id=speech.id)
+        self.assertEqual(speech.audio_status, 'ready')
+        self.assertIsNotNone(speech.celery_task_id)
         resp = self.client.get('/speech/%d' % speech.id)
         self.assertTrue('Please wait' in resp.content)
 
         self.assertIsNotNone(speech.audio)
         self.assertTrue(".mp3" in speech.audio.path)
 
+    def test_speech_audio_conversion_failure(self):
+        audio = open(os.path.join(self._in_fixtures, 'lamb_stereo.wav'), 'rb')
+        self.client.post('/speech/add', { 'audio': audio })
+        speech = Speech.objects.order_by('-id')[0]
+
+        # Any error, not just those from ffmpeg, marks it as failed
+        with patch('speeches.models.Speech.convert_audio') as patched_convert:
+            patched_convert.side_effect = IOError("Boom!")
+            convert_speech_audio(speech.id)
+        self.assertEqual(Speech.objects.get(id=speech.id).audio_status, 'failed')
+
     def test_visible_speeches(self):
         section = Section.objects.create(title='Test', instance=self.instance)
         speeches = []
@@ -376,6 +404,234 @@ class SpeechTests(InstanceTestCase):
         resp = self.client.get('/speech/%d' % speeches[0].id)
         self.assertContains( resp, 'Not Found', status_code=404 )
 
+    def test_instance_statistics(self):
+        section = Section.objects.create(title='Test', instance=self.instance)
+        Speaker.objects.create(name='Steve', instance=self.instance)
+        speeches = [ Speech.objects.create( text='x' * (i+1), section=section, instance=self.instance, public=(i==2) )
+            for i in range(3) ]
+        speeches[0].text = 'Longer'
+        speeches[0].save()
+        speeches[1].public = True
+        speeches[1].save()
+        speeches[2].delete()
+
+        def check():
+            stats = InstanceStatistics.objects.get(instance=self.instance)
+            self.assertEqual(
+                ( stats.speech_count, stats.public_speech_count, stats.section_count, stats.speaker_count, stats.text_length ),
+                ( 2, 1, 1, 1, 8 )
+            )
+            self.assertEqual( stats.average_length, 4 )
+        check()
+        InstanceStatistics.objects.refresh([ self.instance.id ])
+        check()
+
+        resp = self.client.get('/')
+        self.assertEqual( resp.context['count_speeches'], 2 )
+        self.assertEqual( resp.context['count_sections'], 1 )
+        self.assertEqual( resp.context['count_speakers'], 1 )
+        self.client.logout()
+        resp = self.client.get('/')
+        self.assertEqual( resp.context['count_speeches'], 1 )
+
+    def test_unattached_speeches_in_pages(self):
+        date, time = datetime.date(2000, 1, 1), datetime.time(10, 0)
+        speeches = [ Speech.objects.create( text='Speech %d' % i, start_date=d, start_time=t, instance=self.instance )
+            for i, (d, t) in enumerate([ (date.replace(year=1850), time), (date, time), (date, None), (date, None), (None, time), (None, None) ]) ]
+
+        paginate_by = SectionList.speeches_paginate_by
+        SectionList.speeches_paginate_by = 2
+        try:
+            pages = []
+            url = '/speeches'
+            while url:
+                resp = self.client.get(url)
+                pages.append(resp.context['speech_list'])
+                cursor = resp.context['next_cursor']
+                url = cursor and '/speeches?after=%s' % cursor
+        finally:
+            SectionList.speeches_paginate_by = paginate_by
+        self.assertEqual( pages, [ speeches[0:2], speeches[2:4], speeches[4:6] ] )
+
+        resp = self.client.get('/speeches?after=nonsense')
+        self.assertEqual( resp.status_code, 404 )
+
+    def test_conditional_get(self):
+        section = Section.objects.create(title='Test', instance=self.instance)
+        speech = Speech.objects.create( text='Speech', section=section, instance=self.instance )
+        urls = ( '/speech/%d' % speech.id, '/sections/%d' % section.id, '/test' )
+
+        for url in urls:
+            resp = self.client.get(url)
+            etag = resp['ETag']
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual( resp.status_code, 304 )
+            # Instance users aren't told when the page last changed
+            self.assertFalse( resp.has_header('Last-Modified') )
+
+            speech.text = 'Changed for %s' % url
+            speech.save()
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual( resp.status_code, 200 )
+
+        # Others get different validators
+        etags = [ self.client.get(url)['ETag'] for url in urls ]
+        self.client.logout()
+        for url, etag in zip(urls, etags):
+            resp = self.client.get(url)
+            self.assertNotEqual( resp['ETag'], etag )
+            resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=resp['Last-Modified'])
+            self.assertEqual( resp.status_code, 304 )
+
+    def test_conditional_get_related_changes(self):
+        section = Section.objects.create(title='Test', instance=self.instance)
+        speaker = Speaker.objects.create(name='Steve', instance=self.instance)
+        Speech.objects.create( text='Speech', section=section, speaker=speaker, instance=self.instance )
+
+        def rename_speaker():
+            speaker.name = 'Stephen'
+            speaker.save()
+        def rename_section():
+            section.title = 'Renamed'
+            section.save()
+
+        # Each page shows the other's name
+        for url, change in ( ('/speaker/%s' % speaker.slug, rename_section), ('/sections/%d' % section.id, rename_speaker) ):
+            etag = self.client.get(url)['ETag']
+            change()
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual( resp.status_code, 200 )
+
+    def test_conditional_get_neighbour_changes(self):
+        parent = Section.objects.create(title='Parent', instance=self.instance)
+        first = Section.objects.create(title='First', parent=parent, instance=self.instance)
+        second = Section.objects.create(title='Second', parent=parent, instance=self.instance)
+        last = Speech.objects.create( text='Last', section=first, instance=self.instance )
+        speech = Speech.objects.create( text='Speech', section=second, instance=self.instance )
+
+        def rename_first():
+            first.title = 'Renamed'
+            first.save()
+        def edit_last():
+            last.text = 'Changed'
+            last.save()
+
+        # Each page links to the section or speech before it
+        for url, change in ( ('/sections/%d' % second.id, rename_first), ('/speech/%d' % speech.id, edit_last) ):
+            etag = self.client.get(url)['ETag']
+            change()
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual( resp.status_code, 200 )
+
+    @with_locmem_cache(CACHE_MIDDLEWARE_SECONDS=60)
+    def test_page_cache(self):
+        speech = Speech.objects.create( text='Speech', instance=self.instance )
+        url = '/speech/%d' % speech.id
+
+        # Instance users always get a fresh page
+        self.client.get(url)
+        Speech.objects.filter(id=speech.id).update(text='Quietly changed')
+        self.assertContains( self.client.get(url), 'Quietly changed' )
+
+        # Others get a cached one, until something in the instance changes
+        self.client.logout()
+        self.assertContains( self.client.get(url), 'Quietly changed' )
+        Speech.objects.filter(id=speech.id).update(text='Quietly changed again')
+        self.assertNotContains( self.client.get(url), 'again' )
+        Speaker.objects.create(name='Steve', instance=self.instance)
+        self.assertContains( self.client.get(url), 'Quietly changed again' )
+
+    @with_locmem_cache(CACHE_MIDDLEWARE_SECONDS=60)
+    def test_page_cache_other_changes(self):
+        speech = Speech.objects.create( text='Speech', instance=self.instance )
+        url = '/speech/%d' % speech.id
+        self.client.logout()
+        self.client.get(url)
+
+        # The instance's title is on every page
+        self.instance.title = 'Renamed instance'
+        self.instance.save()
+        self.assertContains( self.client.get(url), 'Renamed instance' )
+
+        # As are a speech's tags, in lists
+        namespace = caching.instance_namespace(self.instance.id)
+        version = caching.get_version(namespace)
+        tag = Tag.objects.create( name='Silly', instance=self.instance )
+        self.assertNotEqual( caching.get_version(namespace), version )
+        version = caching.get_version(namespace)
+        speech.tags.add(tag)
+        self.assertNotEqual( caching.get_version(namespace), version )
+        version = caching.get_version(namespace)
+        tag.speech_set.clear()
+        self.assertNotEqual( caching.get_version(namespace), version )
+
+    @with_locmem_cache()
+    def test_speech_fragment_cache(self):
+        section = Section.objects.create(title='Test', instance=self.instance)
+        speeches = [ Speech.objects.create( text='Speech %d' % i, section=section, instance=self.instance,
+            start_date=datetime.date(2000, 1, 1) ) for i in range(2) ]
+        url = '/sections/%d' % section.id
+
+        resp = self.client.get(url)
+        self.assertEqual( fragments.get_counts(), (0, 2) )
+        # The date is only shown once, as before
+        self.assertContains( resp, '1 Jan 2000', count=1 )
+
+        # Unchanged speeches come from the cache
+        Speech.objects.filter(id=speeches[0].id).update(text='Quietly changed')
+        resp = self.client.get(url)
+        self.assertNotContains( resp, 'Quietly changed' )
+        self.assertContains( resp, '1 Jan 2000', count=1 )
+        self.assertEqual( fragments.get_counts(), (2, 2) )
+
+        speeches[1].text = 'Changed'
+        speeches[1].save()
+        resp = self.client.get(url)
+        self.assertContains( resp, 'Changed' )
+        self.assertEqual( fragments.get_counts(), (3, 3) )
+
+        # Changes to things shown with a speech that don't save it
+        tag = Tag.objects.create( name='Silly', instance=self.instance )
+        speeches[0].tags.add(tag)
+        self.assertContains( self.client.get(url), '<span class="label">Silly</span>', html=True )
+        tag.name = 'Sillier'
+        tag.save()
+        self.assertContains( self.client.get(url), '<span class="label">Sillier</span>', html=True )
+        tag.speech_set.clear()
+        self.assertNotContains( self.client.get(url), 'Sillier' )
+
+        person = Person.objects.create( name='Steve', image='http://example.com/steve.jpg',
+            api_instance=ApiInstance.objects.create(url='http://popit.mysociety.org/api/v1/') )
+        speaker = Speaker.objects.create( name='Steve', person=person, instance=self.instance )
+        speeches[1].speaker = speaker
+        speeches[1].save()
+        self.assertContains( self.client.get(url), 'http://example.com/steve.jpg', count=1 )
+        person.image = 'http://example.com/stephen.jpg'
+        person.save()
+        self.assertContains( self.client.get(url), 'http://example.com/stephen.jpg', count=1 )
+
+        # The section's path is in the links even without the breadcrumbs
+        section.slug = 'renamed'
+        section.save()
+        self.assertContains( self.client.get(url), 'renamed#s%d' % speeches[0].id )
+
+        # Re-rendering the HTML doesn't save the speeches
+        call_command('sayit_render_speech_html', all=True, verbosity=0)
+        self.assertContains( self.client.get(url), 'Quietly changed' )
+
+    def test_speech_html(self):
+        speech = Speech.objects.create( text='<b>One</b>\n\n<script>Two</script>', instance=self.instance )
+        html = '<p><b>One</b></p>\n\n<p>&lt;script&gt;Two&lt;/script&gt;</p>'
+        self.assertEqual( speech.text_html, html )
+        resp = self.client.get('/speech/%d' % speech.id)
+        self.assertContains( resp, html )
+
+        # Older speeches are rendered on the fly, then by the command
+        Speech.objects.filter(id=speech.id).update(text_html='')
+        self.assertEqual( Speech.objects.get(id=speech.id).html, html )
+        call_command('sayit_render_speech_html', verbosity=0)
+        self.assertEqual( Speech.objects.get(id=speech.id).text_html, html )
+
     def test_speech_datetime_line(self):
         section = Section.objects.create(title='Test', instance=self.instance)
         Speech.objects.create( text='Speech', section=section, instance=self.instance,
@@ -1,4 +1,5 @@
 from django.conf.urls import patterns, url, include
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 
 from speeches.views import *
@@ -26,6 +27,8 @@ urlpatterns = patterns('',
     url(r'^speech/(?P<pk>\d+)$', SpeechView.as_view(), name='speech-view'),
     url(r'^speech/(?P<pk>\d+)/edit$', SpeechUpdate.as_view(), name='speech-edit'),
     url(r'^speech/(?P<pk>\d+)/delete$', SpeechDelete.as_view(), name='speech-delete'),
+    # Not put in the page cache; the audio is already a file on disk
+    url(r'^speech/(?P<pk>\d+)/audio\.mp3$', never_cache(SpeechAudio.as_view()), name='speech-audio'),
 
     url(r'^speakers$', SpeakerList.as_view(), name='speaker-list'),
     url(r'^speaker/add$', SpeakerCreate.as_view(), name='speaker-add'),
@@ -1,4 +1,5 @@
 import os
+import shutil
 import subprocess
 import mimetypes
 import logging
@@ -6,6 +7,8 @@ import tempfile
 import calendar
 from operator import itemgetter
 from datetime import datetime
+from multiprocessing import cpu_count
+from multiprocessing.pool import ThreadPool
 import audioread.ffdec
 
 import requests
@@ -13,6 +16,9 @@ import pytz
 
 from django.conf import settings
 
+from speeches.utils import mp3
+from speeches.utils.duration import probe_duration
+
 logger = logging.getLogger(__name__)
 
 class TranscribeException(Exception):
@@ -26,7 +32,7 @@ class TranscribeHelper(object):
     def check_speech(self, speech):
         """Check that the supplied speech is ok to transcribe, ie: it has audio
            and no text"""
-        if not bool(speech.audio):
+        if not speech.has_audio:
             raise TranscribeException(
                     'Speech: {0} has no audio file!'.format(speech.id))
         if speech.text.strip():
@@ -148,13 +154,18 @@ class AudioException(Exception):
 
 class AudioHelper(object):
 
-    def make_wav(self, in_filename):
+    def make_wav(self, in_filename, start=None, duration=None):
         """Make a .wav file suitable for uploading to AT&T and return true if
-           it succeeded"""
+           it succeeded. start and duration (in seconds) limit it to a piece
+           of the input."""
         # First make a temporary file
         (fd, out_filename) = tempfile.mkstemp(suffix='.wav')
 
         options = self._build_ffmpeg_options(in_filename)
+        if start:
+            options.extend(['-ss', str(start)])
+        if duration is not None:
+            options.extend(['-t', str(duration)])
         options.extend([
             # Output options
             # Sample rate of 8KHz
@@ -196,8 +207,11 @@ class AudioHelper(object):
 
         return out_filename
 
-    def split_recording(self, recording):
-        """Make a series of .mp3 files from one recording, based on its timestamps"""
+    def split_recording(self, recording, processes=None):
+        """Make a series of .mp3 files from one recording, based on its timestamps.
+           If the pieces have to be cut one at a time, up to processes (by
+           default settings.AUDIO_CUTTING_PROCESSES, or one per core) are cut
+           at once."""
 
         # List of files we'll return
         files = []
@@ -207,6 +221,17 @@ class AudioHelper(object):
             logger.error("Asked to split recording: {0} with no audio, returning immediately".format(recording))
             return files
 
+        # Copy the pieces straight out of an mp3, cut at the frames its seek
+        # table puts them in, which needs no ffmpeg at all
+        if recording.audio.name.lower().endswith('.mp3'):
+            try:
+                table = mp3.get_seek_table(recording.audio.path, save=True)
+            except (mp3.MP3Exception, IOError, OSError) as e:
+                logger.info("Could not read the frames of recording: {0} ({1}), so cutting it with ffmpeg".format(recording, e))
+            else:
+                return [ self.copy_mp3_piece(recording.audio.path, *table.byte_range(start, duration))
+                    for start, duration in recording.audio_pieces() ]
+
         # Do we have any timestamps to split it by?
         if not recording.timestamps.count():
             # No timestamps, so just make an mp3 of the whole thing
@@ -217,18 +242,114 @@ class AudioHelper(object):
             return files
 
         # We have more than one timestamp
-        sorted_timestamps = recording.timestamps.all().order_by("timestamp")
+        sorted_timestamps = list(recording.timestamps.all().order_by("timestamp"))
 
         # munge start_timestamp into the format that make_partial_mp3 expects
         start_timestamp = calendar.timegm(recording.start_datetime.timetuple())
-        for index, timestamp in enumerate(sorted_timestamps):
+
+        # Cut all the pieces in one go, if the timestamps are in the recording
+        # and apart (the segment muxer can't make empty or overlapping pieces)
+        offsets = [ timestamp.utc - start_timestamp for timestamp in sorted_timestamps ]
+        if offsets[0] >= 0 and all(a < b for a, b in zip(offsets, offsets[1:])):
+            files = self.make_segmented_mp3s(recording.audio.path, offsets)
+            if len(files) == len(offsets):
+                return files
+            # A timestamp must be past the end; fall back to doing it as before
+            logger.info("Splitting recording: {0} made {1} files for {2} timestamps, cutting one at a time instead".format(recording, len(files), len(offsets)))
+            for filename in files:
+                os.remove(filename)
+            files = []
+
+        def cut(index):
+            timestamp = sorted_timestamps[index]
             next_timestamp = None
             if index < (len(sorted_timestamps) - 1):
                 next_timestamp = sorted_timestamps[index + 1]
 
-            files.append(self.make_partial_mp3(recording, start_timestamp, timestamp, next_timestamp))
+            return self.make_partial_mp3(recording, start_timestamp, timestamp, next_timestamp)
+
+        indexes = range(len(sorted_timestamps))
+        if processes is None:
+            processes = settings.AUDIO_CUTTING_PROCESSES or cpu_count()
+        processes = min(processes, len(indexes))
+        if processes <= 1:
+            return map(cut, indexes)
 
-        return files
+        # The cutting is done by the ffmpeg processes, so threads are enough
+        # to keep that many going. map returns the files in order, and raises
+        # the first AudioException, as the serial version would.
+        pool = ThreadPool(processes)
+        try:
+            return pool.map(cut, indexes)
+        finally:
+            pool.close()
+            pool.join()
+
+    def make_segmented_mp3s(self, in_filename, offsets):
+        """Cut an mp3 into pieces, each starting at one of offsets (increasing
+           whole seconds from the start) and lasting until the next one or the
+           end, with a single run of ffmpeg. Returns the pieces' filenames in
+           order, which will be fewer than the offsets if any are past the end."""
+        out_dir = tempfile.mkdtemp()
+        try:
+            options = self._build_ffmpeg_options(in_filename)
+            options.extend([
+                '-f',
+                'segment',
+                '-segment_format',
+                'mp3',
+                # Start each piece's timestamps from zero, so it has the right duration
+                '-reset_timestamps',
+                '1',
+            ])
+            # Where to cut; a first offset of zero is the start anyway
+            cuts = [ str(offset) for offset in offsets if offset > 0 ]
+            if cuts:
+                options.extend(['-segment_times', ','.join(cuts)])
+
+            # because the pieces are cut from an mp3, we can use the 'copy' pseudocodec
+            options.extend(self._build_ffmpeg_mp3_output_options(os.path.join(out_dir, '%05d.mp3'), 'copy'))
+
+            with open(os.devnull, 'w') as dev_null:
+                result = subprocess.call(options, stderr=dev_null)
+
+            if not result == 0:
+                message = "FFMPEG failed to split with result: {0} on file: {1}".format(result, in_filename)
+                logger.error(message)
+                raise AudioException(message)
+
+            pieces = sorted(os.listdir(out_dir))
+            if offsets[0] > 0:
+                # The piece before the first offset isn't wanted
+                pieces = pieces[1:]
+
+            # Moved out to temporary files of their own, like the other
+            # methods', so the directory can go
+            files = []
+            for piece in pieces:
+                (fd, out_filename) = tempfile.mkstemp(suffix=".mp3")
+                os.close(fd)
+                shutil.move(os.path.join(out_dir, piece), out_filename)
+                files.append(out_filename)
+            return files
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+    def copy_mp3_piece(self, in_filename, first, end):
+        """Copy the bytes from first up to end of an mp3, which should be
+           frame boundaries, to a new file and return its filename"""
+        (fd, out_filename) = tempfile.mkstemp(suffix=".mp3")
+        with os.fdopen(fd, 'wb') as out_file:
+            with open(in_filename, 'rb') as in_file:
+                in_file.seek(first)
+                left = end - first
+                while left > 0:
+                    data = in_file.read(min(64 * 1024, left))
+                    if not data:
+                        break
+                    out_file.write(data)
+                    left -= len(data)
+        return out_filename
 
     def make_partial_mp3(self, recording, start_timestamp, timestamp, next_timestamp):
         """Make a partial mp3 file for a given timestamp"""
@@ -267,7 +388,13 @@ class AudioHelper(object):
         return out_filename
 
     def get_audio_duration(self, in_filename):
-        return round(audioread.ffdec.FFmpegAudioFile(in_filename).duration)
+        """Return the duration of an audio file in whole seconds, read from its
+           headers if it's a format that has it there, or else by decoding it
+           with ffmpeg"""
+        duration = probe_duration(in_filename)
+        if duration is None:
+            duration = audioread.ffdec.FFmpegAudioFile(in_filename).duration
+        return round(duration)
 
     def _build_ffmpeg_options(self, in_filename):
         return [
@@ -0,0 +1,91 @@
+import os
+import struct
+
+from speeches.utils import mp3
+
+# Reading the duration of an audio file from its headers, which is much
+# quicker than having ffmpeg decode it, for the formats where that's possible.
+
+# How much of the end of an Ogg file to look through for its last page
+_OGG_PROBE_SIZE = 64 * 1024
+
+def wav_duration(path):
+    """Return the duration in seconds of a PCM WAV file, from the size of
+    its data chunk and its byte rate, or None if it isn't PCM."""
+    size = os.path.getsize(path)
+    byte_rate = None
+    with open(path, 'rb') as f:
+        f.seek(12)
+        while True:
+            chunk = f.read(8)
+            if len(chunk) < 8:
+                return None
+            chunk_id, chunk_size = struct.unpack('<4sI', chunk)
+            if chunk_id == 'fmt ':
+                audio_format, channels, sample_rate, byte_rate = struct.unpack('<HHII', f.read(12))
+                # PCM, floating point PCM, or either as WAVE_FORMAT_EXTENSIBLE
+                if audio_format not in (1, 3, 0xFFFE):
+                    return None
+                f.seek(chunk_size - 12 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == 'data':
+                if not byte_rate:
+                    return None
+                # A file written as it was recorded may not have had its
+                # size filled in
+                data_size = min(chunk_size, size - f.tell())
+                return float(data_size) / byte_rate
+            else:
+                # Chunks are padded to an even length
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+def ogg_duration(path):
+    """Return the duration in seconds of an Ogg Vorbis or Opus file, from
+    the granule position of its last page, or None if it's neither."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        first = f.read(_OGG_PROBE_SIZE)
+        f.seek(max(size - _OGG_PROBE_SIZE, 0))
+        last = f.read()
+
+    # The first page holds just the stream's identification header
+    packet = first[27 + ord(first[26]):]
+    if packet.startswith('\x01vorbis'):
+        sample_rate, = struct.unpack('<I', packet[12:16])
+        pre_skip = 0
+    elif packet.startswith('OpusHead'):
+        # Opus granule positions always count at 48kHz
+        sample_rate = 48000
+        pre_skip, = struct.unpack('<H', packet[10:12])
+    else:
+        return None
+    serial = first[14:18]
+
+    end = len(last)
+    while True:
+        end = last.rfind('OggS', 0, end)
+        if end < 0:
+            return None
+        page = last[end:end + 27]
+        if len(page) == 27 and page[14:18] == serial:
+            granule, = struct.unpack('<q', page[6:14])
+            # -1 on a page no packet finishes on
+            if granule >= 0:
+                return float(max(granule - pre_skip, 0)) / sample_rate
+
+def probe_duration(path):
+    """Return the duration in seconds of the audio file at path, read from
+    its headers, or None if it isn't a WAV, MP3 or Ogg file whose headers
+    say, in which case it'll have to be decoded to find out."""
+    with open(path, 'rb') as f:
+        magic = f.read(12)
+    try:
+        if magic[:4] == 'RIFF' and magic[8:12] == 'WAVE':
+            return wav_duration(path)
+        if magic[:4] == 'OggS':
+            return ogg_duration(path)
+        if magic[:3] == 'ID3' or mp3.parse_header(magic[:4].ljust(4, '\0')) is not None:
+            return mp3.header_duration(path)
+    except (struct.error, IndexError):
+        # Cut short or mangled
+        pass
+    return None
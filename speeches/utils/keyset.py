@@ -0,0 +1,67 @@
+import base64
+import datetime
+
+class InvalidCursor(ValueError):
+    pass
+
+# A cursor is the sort key of the last item shown, so that the next page can
+# start just after it with an indexed "(key) > (cursor)" row comparison,
+# however far through a list it is. Keys are tuples of datetimes, dates,
+# times, ints, strings and Nones.
+
+_DATE = '%04d%02d%02d'
+_TIME = '%02d%02d%02d%06d'
+
+def _parse_date(s):
+    if len(s) != 8:
+        raise ValueError(s)
+    return datetime.date(int(s[:4]), int(s[4:6]), int(s[6:]))
+
+def _parse_time(s):
+    if len(s) != 12:
+        raise ValueError(s)
+    return datetime.time(int(s[:2]), int(s[2:4]), int(s[4:6]), int(s[6:]))
+
+def encode_cursor(*values):
+    """Encode a sort key as an opaque, URL-safe string."""
+    parts = []
+    for v in values:
+        if v is None:
+            parts.append('n')
+        # Formatted by hand, as strftime can't do years before 1900
+        elif isinstance(v, datetime.datetime):
+            parts.append('d' + _DATE % (v.year, v.month, v.day) + _TIME % (v.hour, v.minute, v.second, v.microsecond))
+        elif isinstance(v, datetime.date):
+            parts.append('a' + _DATE % (v.year, v.month, v.day))
+        elif isinstance(v, datetime.time):
+            parts.append('t' + _TIME % (v.hour, v.minute, v.second, v.microsecond))
+        elif isinstance(v, (int, long)):
+            parts.append('i%d' % v)
+        else:
+            parts.append('s' + v)
+    return base64.urlsafe_b64encode('|'.join(parts).encode('utf-8'))
+
+def decode_cursor(cursor):
+    """Decode a string made by encode_cursor back into its sort key, raising
+    InvalidCursor if it isn't one."""
+    try:
+        parts = base64.urlsafe_b64decode(str(cursor)).decode('utf-8').split('|')
+        values = []
+        for p in parts:
+            if p == 'n':
+                values.append(None)
+            elif p[0] == 'd':
+                values.append(datetime.datetime.combine(_parse_date(p[1:9]), _parse_time(p[9:])))
+            elif p[0] == 'a':
+                values.append(_parse_date(p[1:]))
+            elif p[0] == 't':
+                values.append(_parse_time(p[1:]))
+            elif p[0] == 'i':
+                values.append(int(p[1:]))
+            elif p[0] == 's':
+                values.append(p[1:])
+            else:
+                raise ValueError(p)
+    except (TypeError, ValueError, IndexError, UnicodeError):
+        raise InvalidCursor(cursor)
+    return tuple(values)
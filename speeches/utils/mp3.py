@@ -0,0 +1,296 @@
+import array
+import bisect
+import os
+import struct
+import sys
+import tempfile
+
+# Reading the frames of an MP3 file, so that a piece of it can be served as
+# it is, cut at frame boundaries, rather than re-encoded.
+
+class MP3Exception(Exception):
+    """The file isn't an MP3 we can read the frames of"""
+    pass
+
+# Bitrates in kbps, by MPEG version (1, or 2 and 2.5), layer and index
+_BITRATES = {
+    (1, 1): [ 0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448 ],
+    (1, 2): [ 0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384 ],
+    (1, 3): [ 0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320 ],
+    (2, 1): [ 0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256 ],
+    (2, 2): [ 0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160 ],
+    (2, 3): [ 0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160 ],
+}
+
+# Sample rates by the version bits of the header (1 is reserved)
+_SAMPLE_RATES = {
+    0: [ 11025, 12000, 8000 ],  # MPEG 2.5
+    2: [ 22050, 24000, 16000 ], # MPEG 2
+    3: [ 44100, 48000, 32000 ], # MPEG 1
+}
+
+# A stored seek table is this header (magic, sample rate and number of
+# entries), then the offsets, then the sample counts
+_MAGIC = 'MP3S'
+_HEADER = struct.Struct('<4sII')
+_TYPECODE = 'I' if array.array('I').itemsize == 4 else 'L'
+_ITEMSIZE = 4
+
+# How far past any ID3v2 tag to look for the first frame
+_PROBE_SIZE = 64 * 1024
+# How many frames have to have the same bitrate for a file without a Xing or
+# VBRI header to be taken as constant bitrate
+_CBR_CHECK_FRAMES = 8
+
+def _header_fields(header):
+    """Return the MPEG version (1, or 2 for 2 and 2.5), layer, bitrate in bits
+    per second, sample rate and padding of the frame with the given four byte
+    header, or None if it isn't one."""
+    b0, b1, b2 = ord(header[0]), ord(header[1]), ord(header[2])
+    if b0 != 0xFF or b1 & 0xE0 != 0xE0:
+        return None
+    version_bits = (b1 >> 3) & 3
+    layer = 4 - ((b1 >> 1) & 3)
+    bitrate_index = b2 >> 4
+    sample_rate_index = (b2 >> 2) & 3
+    if version_bits == 1 or layer == 4 or bitrate_index in (0, 15) or sample_rate_index == 3:
+        return None
+    version = 1 if version_bits == 3 else 2
+    bitrate = _BITRATES[(version, layer)][bitrate_index] * 1000
+    sample_rate = _SAMPLE_RATES[version_bits][sample_rate_index]
+    padding = (b2 >> 1) & 1
+    return version, layer, bitrate, sample_rate, padding
+
+def parse_header(header):
+    """Return the length in bytes, number of samples and sample rate of the
+    frame with the given four byte header, or None if it isn't one."""
+    fields = _header_fields(header)
+    if fields is None:
+        return None
+    version, layer, bitrate, sample_rate, padding = fields
+
+    if layer == 1:
+        return (12 * bitrate // sample_rate + padding) * 4, 384, sample_rate
+    if layer == 3 and version == 2:
+        return 72 * bitrate // sample_rate + padding, 576, sample_rate
+    return 144 * bitrate // sample_rate + padding, 1152, sample_rate
+
+def _skip_id3v2(f):
+    """Return the offset of the first byte after any ID3v2 tag at the start."""
+    header = f.read(10)
+    if len(header) == 10 and header[:3] == 'ID3':
+        size = 0
+        for b in header[6:10]:
+            size = (size << 7) | (ord(b) & 0x7F)
+        footer = 10 if ord(header[5]) & 0x10 else 0
+        return 10 + size + footer
+    return 0
+
+def _first_frame(f, size):
+    """Return the offset and header of the first audio frame of the file
+    within _PROBE_SIZE bytes of the end of any ID3v2 tag, or None. A frame
+    only counts if the next one follows it, in case it's a false sync."""
+    start = _skip_id3v2(f)
+    f.seek(start)
+    data = f.read(_PROBE_SIZE)
+    i = data.find('\xff')
+    while 0 <= i < len(data) - 3:
+        frame = parse_header(data[i:i + 4])
+        if frame is not None:
+            following = data[i + frame[0]:i + frame[0] + 4]
+            if start + i + frame[0] >= size or len(following) < 4 or parse_header(following) is not None:
+                return start + i, data[i:]
+        i = data.find('\xff', i + 1)
+    return None
+
+def header_duration(path):
+    """Return the duration in seconds of an MP3 file, read from the frame
+    count in its Xing/Info or VBRI header, or if it has neither, worked out
+    from its size at the bitrate of its first frames (which is right for the
+    constant bitrate files without one). Returns None if no frame is found
+    near the start, or if the first frames' bitrates differ."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        first = _first_frame(f, size)
+        if first is None:
+            return None
+        offset, data = first
+        end = size
+        if size >= 128:
+            f.seek(-128, os.SEEK_END)
+            if f.read(3) == 'TAG':
+                # An ID3v1 tag at the end
+                end -= 128
+    bitrate = _header_fields(data[:4])[2]
+    length, samples, sample_rate = parse_header(data[:4])
+    frame = data[:length]
+
+    for tag in ('Xing', 'Info'):
+        at = frame.find(tag, 4, 64)
+        if at >= 0 and len(frame) >= at + 12:
+            flags, = struct.unpack('>I', frame[at + 4:at + 8])
+            if flags & 1:
+                frames, = struct.unpack('>I', frame[at + 8:at + 12])
+                return float(frames * samples) / sample_rate
+    # VBRI comes 32 bytes after the header, with the frame count 14 in
+    if frame[36:40] == 'VBRI' and len(frame) >= 54:
+        frames, = struct.unpack('>I', frame[50:54])
+        return float(frames * samples) / sample_rate
+    # Without either, it should be constant bitrate; if the first few frames
+    # say otherwise, there's no telling without reading them all
+    at = length
+    for i in range(_CBR_CHECK_FRAMES):
+        fields = _header_fields(data[at:at + 4]) if len(data) >= at + 4 else None
+        if fields is None:
+            break
+        if fields[2] != bitrate:
+            return None
+        at += parse_header(data[at:at + 4])[0]
+    return (end - offset) * 8.0 / bitrate
+
+def _is_info_frame(data):
+    """Whether the frame is a Xing/LAME header, which holds no audio."""
+    return 'Xing' in data[:64] or 'Info' in data[:64]
+
+class SeekTable(object):
+    """The byte offset and time, as a count of samples, of the start of each
+    audio frame of an MP3 file, with one more entry for the end of the last
+    frame. They're kept in packed arrays of 32-bit integers, so a table can be
+    made once, stored beside the file, and loaded quickly."""
+
+    def __init__(self, offsets, samples, sample_rate):
+        self.offsets = offsets
+        self.samples = samples
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_mp3(cls, path):
+        """Make the table by reading the frame headers of an MP3 file."""
+        offsets = array.array(_TYPECODE)
+        samples = array.array(_TYPECODE)
+        total = 0
+        sample_rate = None
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            offset = _skip_id3v2(f)
+            first = True
+            while offset + 4 <= size:
+                f.seek(offset)
+                header = f.read(4)
+                frame = parse_header(header)
+                if frame is None:
+                    if header[:3] == 'TAG':
+                        # An ID3v1 tag at the end
+                        break
+                    # Lost sync, so look for the next frame a byte on
+                    offset += 1
+                    continue
+                length, frame_samples, sample_rate = frame
+                if offset + length > size:
+                    # Cut short
+                    break
+                if first:
+                    first = False
+                    if _is_info_frame(header + f.read(min(length, 64) - 4)):
+                        offset += length
+                        continue
+                offsets.append(offset)
+                samples.append(total)
+                total += frame_samples
+                offset += length
+        if not offsets:
+            raise MP3Exception("No MP3 frames found in {0}".format(path))
+        offsets.append(offset)
+        samples.append(total)
+        return cls(offsets, samples, sample_rate)
+
+    @classmethod
+    def loads(cls, data):
+        """Make the table from a string made by dumps."""
+        if len(data) < _HEADER.size or data[:4] != _MAGIC:
+            raise MP3Exception("Not a seek table")
+        magic, sample_rate, count = _HEADER.unpack_from(data)
+        arrays = []
+        for i in range(2):
+            start = _HEADER.size + i * count * _ITEMSIZE
+            a = array.array(_TYPECODE, data[start:start + count * _ITEMSIZE])
+            if len(a) != count:
+                raise MP3Exception("Seek table cut short")
+            if sys.byteorder != 'little':
+                a.byteswap()
+            arrays.append(a)
+        return cls(arrays[0], arrays[1], sample_rate)
+
+    def dumps(self):
+        """Return the table packed into a string, little-endian."""
+        parts = [ _HEADER.pack(_MAGIC, self.sample_rate, len(self.offsets)) ]
+        for a in (self.offsets, self.samples):
+            if sys.byteorder != 'little':
+                a = array.array(_TYPECODE, a)
+                a.byteswap()
+            parts.append(a.tostring())
+        return ''.join(parts)
+
+    @property
+    def duration(self):
+        """The length of the audio in seconds."""
+        return float(self.samples[-1]) / self.sample_rate
+
+    def frame_at(self, time):
+        """Return the index of the frame playing time seconds in."""
+        return max(bisect.bisect_right(self.samples, time * self.sample_rate) - 1, 0)
+
+    def byte_range(self, start, duration=None):
+        """Return the first and one after the last byte of the frames that
+        cover duration seconds from start seconds in (or to the end if
+        duration is None)."""
+        # From the frame start falls in, up to the one the end falls in, so
+        # that consecutive pieces meet
+        first = self.frame_at(start)
+        if duration is None:
+            last = len(self.offsets) - 1
+        else:
+            last = max(self.frame_at(start + duration), first)
+        return self.offsets[first], self.offsets[last]
+
+def seek_table_path(path):
+    """Where the seek table of the MP3 file at path is stored."""
+    return path + '.seek'
+
+def write_seek_table(path):
+    """Make the seek table of the MP3 file at path, store it beside the
+    file, and return it."""
+    table = SeekTable.from_mp3(path)
+    table_path = seek_table_path(path)
+    # Written to a temporary file and moved into place, so that a table
+    # being read is never half written
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(table_path))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(table.dumps())
+        os.rename(tmp_path, table_path)
+    except:
+        os.remove(tmp_path)
+        raise
+    return table
+
+def get_seek_table(path, save=False):
+    """Return the seek table of the MP3 file at path, loading the stored one
+    if it's up to date. Otherwise it's made from the file, and stored if
+    save is true."""
+    table_path = seek_table_path(path)
+    try:
+        if os.path.getmtime(table_path) >= os.path.getmtime(path):
+            with open(table_path, 'rb') as f:
+                return SeekTable.loads(f.read())
+    except (IOError, OSError, MP3Exception):
+        pass
+    if save:
+        return write_seek_table(path)
+    return SeekTable.from_mp3(path)
+
+def byte_range(path, start, duration=None):
+    """Return the first and one after the last byte of the frames of the
+    MP3 file that cover duration seconds from start seconds in (or to the
+    end if duration is None)."""
+    return get_seek_table(path).byte_range(start, duration)
@@ -0,0 +1,12 @@
+from django.utils.html import linebreaks
+from django.utils.safestring import mark_safe
+
+from django_bleach.templatetags.bleach_tags import bleach_value
+
+def text_to_html(text):
+    """Return text sanitised with the BLEACH_* settings and split into
+    paragraphs, as the templates' "bleach|linebreaks" filters would."""
+    if not text:
+        return mark_safe(u'')
+    # Bleached text is already safe, so linebreaks mustn't escape it again
+    return mark_safe(linebreaks(bleach_value(text), autoescape=False))
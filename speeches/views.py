@@ -1,26 +1,28 @@
 import datetime
 import json
 
-from django.http import HttpResponse, HttpResponseRedirect
+from django.http import HttpResponse, HttpResponseRedirect, Http404
 from django.core.urlresolvers import reverse, reverse_lazy, resolve
 from django.core import serializers
 from django.conf import settings
+from django.db import transaction
 from django.contrib import messages
 from django.utils.translation import ugettext as _
 
-from django.db.models import Count, Avg
 from django.core.files import File
 from django.shortcuts import get_object_or_404
 
 from instances.views import InstanceFormMixin, InstanceViewMixin
 from popit.models import ApiInstance
 
-from speeches.aggregates import Length
+from speeches import caching
 from speeches.forms import SpeechForm, SpeechAudioForm, SectionForm, RecordingAPIForm, SpeakerForm, SectionPickForm, SpeakerPopitForm, RecordingForm, RecordingTimestampFormSet
-from speeches.models import Speech, Speaker, Section, Recording, Tag, RecordingTimestamp
+from speeches.models import Speech, Speaker, Section, Recording, Tag, RecordingTimestamp, InstanceStatistics, SpeakerStatistics, SectionPath
 import speeches.utils
 from speeches.utils import AudioHelper, AudioException
-from speeches.mixins import Base32SingleObjectMixin, UnmatchingSlugException
+from speeches.utils.keyset import InvalidCursor
+from speeches.utils import mp3
+from speeches.mixins import Base32SingleObjectMixin, ConditionalGetMixin, KeysetPaginationMixin, UnmatchingSlugException
 
 from django.views.generic import View, CreateView, UpdateView, DeleteView, DetailView, ListView, RedirectView, FormView
 from django.views.generic.detail import SingleObjectMixin
@@ -201,13 +203,109 @@ class SpeechCreate(SpeechMixin, CreateView):
 class SpeechUpdate(SpeechMixin, UpdateView):
     pass
 
-class SpeechView(NamespaceMixin, InstanceViewMixin, DetailView):
+def _latest(rows):
+    """The latest of the times in the first row of a values_list, if any."""
+    times = [ t for row in rows[:1] for t in row if t ]
+    return max(times) if times else None
+
+class SpeechView(NamespaceMixin, InstanceViewMixin, ConditionalGetMixin, DetailView):
     model = Speech
 
     def get_queryset(self):
         return super(SpeechView, self).get_queryset().visible(self.request)
 
-class InstanceView(NamespaceMixin, InstanceViewMixin, ListView):
+    def get_last_modified(self, request, *args, **kwargs):
+        # Its section's subtree covers the next and previous speeches, as the
+        # sections next to it are touched when their first or last changes
+        return _latest(Speech.objects.filter(instance=request.instance, pk=kwargs['pk']).visible(request).values_list(
+            'modified', 'speaker__modified', 'section__rollup__subtree_modified'))
+
+def _requested_range(header, length):
+    """Return the first and one after the last byte of a resource of length
+    bytes asked for by a Range header, or None to send all of it (if there's
+    no header, or it's not one we handle). Raises ValueError if the range
+    can't be satisfied."""
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[6:].partition('-')
+    try:
+        if first:
+            first = int(first)
+            last = int(last) + 1 if last else length
+        else:
+            # The last however many bytes
+            first, last = max(length - int(last), 0), length
+    except ValueError:
+        return None
+    if first >= length or first >= last:
+        raise ValueError(header)
+    return first, min(last, length)
+
+class _FileRange(object):
+    """The bytes of a file from start up to stop, read a chunk at a time as
+    the response is sent. Unlike a generator, it can be iterated over more
+    than once, as the middleware that reads a response's content does."""
+
+    chunk_size = 64 * 1024
+
+    def __init__(self, path, start, stop):
+        self.path = path
+        self.start = start
+        self.stop = stop
+
+    def __iter__(self):
+        with open(self.path, 'rb') as f:
+            f.seek(self.start)
+            left = self.stop - self.start
+            while left > 0:
+                data = f.read(min(self.chunk_size, left))
+                if not data:
+                    break
+                left -= len(data)
+                yield data
+
+class SpeechAudio(InstanceViewMixin, SingleObjectMixin, View):
+    """The audio of a speech that is a piece of a recording, served straight
+    from the recording's mp3, cut at the frames its seek table gives for the
+    speech's time. Range requests are answered, so that players can seek."""
+    model = Speech
+
+    def get_queryset(self):
+        return super(SpeechAudio, self).get_queryset().visible(self.request).filter(
+            recording__isnull=False).select_related('recording')
+
+    def get(self, request, *args, **kwargs):
+        speech = self.get_object()
+        path = speech.recording.audio.path
+        try:
+            table = mp3.get_seek_table(path, save=True)
+            offset, end = table.byte_range(speech.recording_start, speech.recording_duration)
+        except (mp3.MP3Exception, IOError, OSError):
+            raise Http404
+        length = end - offset
+
+        try:
+            requested = _requested_range(request.META.get('HTTP_RANGE'), length)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%d' % length
+            return response
+
+        if requested:
+            start, stop = requested
+            response = HttpResponse(_FileRange(path, offset + start, offset + stop), content_type='audio/mpeg', status=206)
+            response['Content-Range'] = 'bytes %d-%d/%d' % (start, stop - 1, length)
+        else:
+            start, stop = 0, length
+            response = HttpResponse(_FileRange(path, offset, end), content_type='audio/mpeg')
+        response['Content-Length'] = stop - start
+        response['Accept-Ranges'] = 'bytes'
+        # Stops GZipMiddleware compressing it, which would gain little and
+        # leave the Content-Range and Content-Length wrong
+        response['Content-Encoding'] = 'identity'
+        return response
+
+class InstanceView(NamespaceMixin, InstanceViewMixin, KeysetPaginationMixin, ListView):
     """Done as a ListView on Speech to get recent speeches, we get instance for
     free in the request."""
     model = Speech
@@ -222,30 +320,62 @@ class InstanceView(NamespaceMixin, InstanceViewMixin, ListView):
 
     def get_context_data(self, **kwargs):
         context = super(InstanceView, self).get_context_data(**kwargs)
-        context['count_speeches'] = Speech.objects.for_instance(self.request.instance).visible(self.request).count()
-        context['count_sections'] = Section.objects.for_instance(self.request.instance).count()
-        context['count_speakers'] = Speaker.objects.for_instance(self.request.instance).count()
-        context['average_length'] = Speech.objects.for_instance(self.request.instance).annotate(length=Length('text')).aggregate(avg=Avg('length'))['avg']
+        statistics = InstanceStatistics.objects.for_instance(self.request.instance)
+        context['count_speeches'] = statistics.visible_speech_count(self.request)
+        context['count_sections'] = statistics.section_count
+        context['count_speakers'] = statistics.speaker_count
+        context['average_length'] = statistics.average_length
+        Section.objects.resolve_paths(context['object_list'])
         return context
 
 # It doesn't actually use base32 IDs in the URL, but this works around Django
 # 1.4 generic view bug, and allows non-canonical slug redirects to Just Work.
-class SpeakerView(NamespaceMixin, InstanceViewMixin, Base32SingleObjectMixin, ListView):
+class SpeakerView(NamespaceMixin, InstanceViewMixin, Base32SingleObjectMixin, ConditionalGetMixin, KeysetPaginationMixin, ListView):
     model = Speaker
     paginate_by = 50
     template_name = 'speeches/speaker_detail.html'
     slug_field = 'slugs__slug'
 
+    def get_last_modified(self, request, *args, **kwargs):
+        # Only for the current slug; old ones are redirected
+        return _latest(Speaker.objects.filter(instance=request.instance, slug=kwargs['slug']).values_list(
+            'modified', 'statistics__speech_modified'))
+
+    def get_object(self, queryset=None):
+        # Try the speaker the slug was last found to be, to save the join
+        # through all the slugs
+        key = caching.speaker_slug_key(self.request.instance.id, self.kwargs['slug'])
+        speaker_id = caching.cache.get(key)
+        if speaker_id:
+            obj = list(queryset.filter(pk=speaker_id))
+            if obj:
+                if obj[0].slug != self.kwargs['slug']:
+                    raise UnmatchingSlugException(obj[0])
+                return obj[0]
+        try:
+            obj = super(SpeakerView, self).get_object(queryset)
+        except UnmatchingSlugException, e:
+            caching.cache.set(key, e.args[0].id, caching.TIMEOUT)
+            raise
+        caching.cache.set(key, obj.id, caching.TIMEOUT)
+        return obj
+
     def get_queryset(self):
         queryset = super(SpeakerView, self).get_queryset()
         self.object = self.get_object(queryset)
         return self.object.speech_set.all().visible(self.request).select_related('section', 'speaker').prefetch_related('tags')
 
     def get_context_data(self, **kwargs):
-        kwargs['speech_list'] = self.object_list
         context = super(SpeakerView, self).get_context_data(**kwargs)
-        context['section_count'] = self.object.speech_set.all().visible(self.request).aggregate(Count('section', distinct=True))['section__count']
-        context['longest_speech'] = self.object.speech_set.annotate(length=Length('text')).order_by('-length')[:1]
+        # The page is a list, so has no name of its own
+        context['speech_list'] = context['object_list']
+        statistics = SpeakerStatistics.objects.for_speaker(self.object)
+        context['speech_count'] = statistics.visible_speech_count(self.request)
+        context['section_count'] = statistics.visible_section_count(self.request)
+        context['first_speech_date'] = statistics.first_speech_date
+        context['last_speech_date'] = statistics.last_speech_date
+        context['longest_speech'] = statistics.longest_speech
+        Section.objects.resolve_paths(context['speech_list'])
         return context
 
 class SpeakerMixin(NamespaceMixin, InstanceFormMixin):
@@ -256,6 +386,18 @@ class SpeakerList(NamespaceMixin, InstanceViewMixin, ListView):
     model = Speaker
     context_object_name = 'speaker_list'
 
+    def get_queryset(self):
+        return super(SpeakerList, self).get_queryset().select_related('statistics')
+
+    def get_context_data(self, **kwargs):
+        context = super(SpeakerList, self).get_context_data(**kwargs)
+        for speaker in context['speaker_list']:
+            try:
+                speaker.speech_count = speaker.statistics.visible_speech_count(self.request)
+            except SpeakerStatistics.DoesNotExist:
+                speaker.speech_count = None
+        return context
+
 class SpeakerCreate(SpeakerMixin, CreateView):
     pass
 
@@ -284,9 +426,11 @@ class SpeakerPopit(NamespaceMixin, InstanceFormMixin, FormView):
         messages.add_message(self.request, messages.SUCCESS, "PopIt instance added, %d new speakers added." % new)
         return super(SpeakerPopit, self).form_valid(form)
 
-class SectionList(NamespaceMixin, InstanceViewMixin, ListView):
+class SectionList(NamespaceMixin, InstanceViewMixin, KeysetPaginationMixin, ListView):
     model = Section
     context_object_name = 'section_list'
+    # Of the speeches not in a section; the top-level sections aren't paged
+    speeches_paginate_by = 100
 
     def get_queryset(self):
         qs = super(SectionList, self).get_queryset()
@@ -294,11 +438,10 @@ class SectionList(NamespaceMixin, InstanceViewMixin, ListView):
         return qs
 
     def get_context_data(self, **kwargs):
-        context = super(SectionList, self).get_context_data(**kwargs)
-
-        # Add in a QuerySet of all the speeches not in a section
-        context['speech_list'] = Speech.objects.for_instance(self.request.instance).visible(self.request).filter(section=None).select_related('speaker').prefetch_related('tags')
-        return context
+        # Add in a page of the speeches not in a section
+        speeches = Speech.objects.for_instance(self.request.instance).visible(self.request).filter(section=None).select_related('speaker').prefetch_related('tags')
+        kwargs['speech_list'], self.next_cursor = self.keyset_page(speeches, self.speeches_paginate_by)
+        return super(SectionList, self).get_context_data(**kwargs)
 
 class SectionMixin(NamespaceMixin, InstanceFormMixin):
     model = Section
@@ -332,8 +475,21 @@ class SectionDelete(SectionMixin, DeleteView):
     def get_success_url(self):
         return self.reverse_lazy('speeches:section-list')
 
-class SectionView(NamespaceMixin, InstanceViewMixin, DetailView):
+class SectionView(NamespaceMixin, InstanceViewMixin, ConditionalGetMixin, DetailView):
     model = Section
+    # Sections with more speeches than this are shown a window at a time
+    paginate_by = 100
+
+    def get_last_modified(self, request, *args, **kwargs):
+        # The subtree is touched when the sections next to it change too
+        if kwargs.get('pk'):
+            rows = Section.objects.filter(instance=request.instance, pk=kwargs['pk']).values_list(
+                'modified', 'rollup__subtree_modified')
+        else:
+            # Only for the current path; old ones are redirected
+            rows = SectionPath.objects.filter(instance=request.instance, path=kwargs['full_slug'], canonical=True).values_list(
+                'section__modified', 'section__rollup__subtree_modified')
+        return _latest(rows)
 
     def get(self, request, *args, **kwargs):
         try:
@@ -346,6 +502,14 @@ class SectionView(NamespaceMixin, InstanceViewMixin, DetailView):
         if pk is not None:
             return super(SectionView, self).get_object(queryset)
         full_slug = self.kwargs.get('full_slug', None)
+        obj, canonical = SectionPath.objects.resolve(self.request.instance, full_slug)
+        if obj:
+            if not canonical:
+                raise UnmatchingSlugException(obj.get_absolute_url())
+            return obj
+
+        # Not a path we know, but it may use old slugs from before paths
+        # were recorded, so try each level in turn
         slugs = full_slug.split('/')
         parent = None
         for i, slug in enumerate(slugs):
@@ -361,8 +525,22 @@ class SectionView(NamespaceMixin, InstanceViewMixin, DetailView):
     def get_context_data(self, **kwargs):
         # Call the base implementation first to get a context
         context = super(SectionView, self).get_context_data(**kwargs)
-        # Add in a QuerySet of all the speeches in this section
-        context['section_tree'] = kwargs['object'].get_descendants_tree_with_speeches(self.request)
+        section = kwargs['object']
+        after = self.request.GET.get('after')
+        if after or section.rollup.speech_count > self.paginate_by:
+            try:
+                context['section_tree'], context['next_cursor'] = section.get_descendants_tree_with_speeches_page(
+                    self.request, after=after, size=self.paginate_by)
+            except InvalidCursor:
+                raise Http404
+            context['is_paginated'] = True
+            context['is_first_page'] = not after
+            nodes = [ node for node, _ in context['section_tree'] if isinstance(node, Section) ]
+        else:
+            # Add in a QuerySet of all the speeches in this section
+            context['section_tree'] = section.get_descendants_tree_with_speeches(self.request)
+            nodes = [ node for node, _ in section.get_descendants_tree ]
+        Section.objects.resolve_paths([ section ] + nodes)
         return context
 
 class BothObjectAndFormMixin(object):
@@ -429,17 +607,20 @@ class RecordingUpdate(NamespaceMixin, InstanceFormMixin, DetailView):
             form.fields['timestamp'].recording_start = recording.start_datetime
 
         if recordingtimestamp_formset.is_valid():
-            recordingtimestamp_formset.save()
+            with transaction.commit_on_success():
+                recordingtimestamp_formset.save()
 
-            recording.create_or_update_speeches(self.request.instance)
+                # then delete the associated speeches, as Django can't
+                # infer a cascade here
+                for form in recordingtimestamp_formset.deleted_forms:
+                    try:
+                        form.instance.speech.delete()
+                    except:
+                        logger.info("Timestamp isn't linked to speech")
 
-            # then delete the associated speeches, as Django can't
-            # infer a cascade here
-            for form in recordingtimestamp_formset.deleted_forms:
-                try:
-                    form.instance.speech.delete()
-                except:
-                    logger.info("Timestamp isn't linked to speech")
+            # Re-split the recording in a celery task, once all that is
+            # committed, so that it can't remake the deleted speeches
+            recording.queue_audio_processing()
 
             return HttpResponseRedirect( recording.get_absolute_url() )
         return self.render_to_response(context)
@@ -476,12 +657,9 @@ class RecordingAPICreate(InstanceFormMixin, JSONResponseMixin, CreateView):
             recording.start_datetime = recording_timestamps[0].timestamp
             recording.save()
 
-        # Create speeches from the recording
-        speeches = recording.create_or_update_speeches(self.request.instance)
-
-        # Transcribe each speech
-        for speech in speeches:
-            speech.start_transcribing()
+        # Convert the recording and create speeches from it, then
+        # transcribe each of them, in a celery task
+        recording.queue_audio_processing()
 
         # Return a 201 response
         serialisable_fields = ('audio', 'timestamps')
@@ -1,9 +1,14 @@
 """Thanks to http://stackoverflow.com/a/12977709/669631, though I had to use
    __dict__ rather than _meta.fields for it to work in the admin."""
 
+from django.conf import settings
+from django.core.cache import get_cache
 from django.db.models import signals
+from django.utils.cache import get_cache_key, get_max_age, learn_cache_key
 from django.utils.functional import curry
 
+from speeches import caching
+
 class WhoDidMiddleware(object):
     def process_request(self, request):
         if not request.method in ('GET', 'HEAD', 'OPTIONS', 'TRACE'):
@@ -23,3 +28,74 @@ class WhoDidMiddleware(object):
         if 'created_by_id' in instance.__dict__ and not instance.created_by:
             instance.created_by = user
 
+
+
+def _cache_key_prefix(request):
+    """The prefix of the keys of the request's cached pages, including the
+    version of its instance's namespace, so that any change to the instance
+    means new keys. None if the page shouldn't be cached: outside an
+    instance, for the instance's users (who may see private speeches, and
+    must never be given a page cached for the public), or with no cache."""
+    instance = getattr(request, 'instance', None)
+    if not instance or getattr(request, 'is_user_instance', False):
+        return None
+    namespace = caching.instance_namespace(instance.id)
+    version = caching.get_version(namespace)
+    if version is None:
+        return None
+    return caching.versioned_key(namespace, version, settings.CACHE_MIDDLEWARE_KEY_PREFIX)
+
+class InstanceFetchFromCacheMiddleware(object):
+    """Like Django's FetchFromCacheMiddleware, but with per-instance
+    versioned keys (see _cache_key_prefix). Goes after the instance and
+    authentication middleware."""
+
+    def __init__(self):
+        self.cache = get_cache(settings.CACHE_MIDDLEWARE_ALIAS)
+
+    def process_request(self, request):
+        request._cache_update_cache = False
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        key_prefix = _cache_key_prefix(request)
+        if key_prefix is None:
+            return None
+
+        response = None
+        for method in ( 'GET', 'HEAD' ) if request.method == 'HEAD' else ( 'GET', ):
+            cache_key = get_cache_key(request, key_prefix, method, cache=self.cache)
+            if cache_key is not None:
+                response = self.cache.get(cache_key)
+            if response is not None:
+                return response
+        request._cache_update_cache = True
+        return None
+
+class InstanceUpdateCacheMiddleware(object):
+    """Like Django's UpdateCacheMiddleware, but with per-instance versioned
+    keys, so pages can be cached for a long time, as any change to the
+    instance stops them being used. Browsers aren't told to cache them, as
+    they can't know about changes; they can revalidate instead. Goes first."""
+
+    def __init__(self):
+        self.cache_timeout = settings.CACHE_MIDDLEWARE_SECONDS
+        self.cache = get_cache(settings.CACHE_MIDDLEWARE_ALIAS)
+
+    def process_response(self, request, response):
+        if not getattr(request, '_cache_update_cache', False) or response.status_code != 200:
+            return response
+        if not self.cache_timeout or response.has_header('Set-Cookie'):
+            return response
+        # As Django's does, leave out responses marked as not to be cached
+        # (by never_cache, say)
+        if get_max_age(response) == 0:
+            return response
+        key_prefix = _cache_key_prefix(request)
+        if key_prefix is None:
+            return response
+        cache_key = learn_cache_key(request, response, self.cache_timeout, key_prefix, cache=self.cache)
+        if hasattr(response, 'render') and callable(response.render):
+            response.add_post_render_callback(lambda r: self.cache.set(cache_key, r, self.cache_timeout))
+        else:
+            self.cache.set(cache_key, response, self.cache_timeout)
+        return response
@@ -75,7 +75,7 @@ TEMPLATE_LOADERS = loaders
 
 MIDDLEWARE_CLASSES = [
     'django.middleware.gzip.GZipMiddleware',
-    'django.middleware.cache.UpdateCacheMiddleware',
+    'spoke.middleware.InstanceUpdateCacheMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,7 +85,7 @@ MIDDLEWARE_CLASSES = [
     'pagination.middleware.PaginationMiddleware',
     'instances.middleware.MultiInstanceMiddleware',
     'spoke.middleware.WhoDidMiddleware',
-    'django.middleware.cache.FetchFromCacheMiddleware',
+    'spoke.middleware.InstanceFetchFromCacheMiddleware',
     # Uncomment the next line for simple clickjacking protection:
     # 'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -243,7 +243,9 @@ else:
         'LOCATION': '127.0.0.1:11211',
         'KEY_PREFIX': DATABASES['default']['NAME'],
     }
-    CACHE_MIDDLEWARE_SECONDS = 3600
+    # Pages are cached under their instance's version, so can be kept until
+    # anything in the instance changes (see spoke.middleware)
+    CACHE_MIDDLEWARE_SECONDS = 60 * 60 * 24 * 7
 
 CACHES = {
     'default': cache
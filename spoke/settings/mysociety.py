@@ -50,3 +50,10 @@ BROKER_URL = config.get('CELERY_BROKER_URL')
 SPEECH_SUMMARY_LENGTH = config.get('SPEECH_SUMMARY_LENGTH')
 # Default auto-transcription text
 DEFAULT_TRANSCRIPTION = config.get('DEFAULT_TRANSCRIPTION')
+
+# Audio
+# Most ffmpeg processes to run at once cutting up a recording (0 means one per core)
+AUDIO_CUTTING_PROCESSES = int(config.get('AUDIO_CUTTING_PROCESSES') or 0)
+# Serve the audio of speeches made from a recording from the recording itself,
+# rather than copying each speech's piece of it
+SPEECH_AUDIO_FROM_RECORDINGS = bool(int(config.get('SPEECH_AUDIO_FROM_RECORDINGS') or 0))